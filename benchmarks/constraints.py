@@ -0,0 +1,132 @@
+"""Compare native and Python evaluators for the capacity and time window dimensions.
+
+Each dataset gets synthetic demands, service times and time windows from a
+fixed seed. The same model is then built twice: once with the travel times and
+demands registered as a native transit matrix and unary transit vector (as
+vrpSolver does), and once with Python transit callbacks looking them up. Both
+are searched with the same deterministic parameters, so they visit the same
+solutions and only the cost of evaluating the dimensions differs. The bulk
+NumPy build of the travel time matrix is timed against a per-pair Python loop.
+
+Usage: python benchmarks/constraints.py [--solution-limit N] [--repeat N]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import vrpSolver
+from datasets import Coordinates, load_coordinates
+
+DATASETS = ['locations_200.json', 'locations_1000.json']
+HOUR = 3600
+
+def with_synthetic_constraints(locations, seed):
+    """The locations with demands of 1-9, 5 minute service times and 3 hour windows
+    opening on the hour within the first 8 hours; the depot is open for 14 hours."""
+    rng = np.random.default_rng(seed)
+    num_locations = len(locations)
+    demands = rng.integers(1, 10, num_locations).astype(np.float64)
+    service_times = np.full(num_locations, 300.0)
+    opens = rng.integers(0, 9, num_locations) * HOUR
+    time_windows = np.column_stack((opens, opens + 3 * HOUR)).astype(np.float64)
+    demands[0] = service_times[0] = 0
+    time_windows[0] = (0, 14 * HOUR)
+    return Coordinates(locations.latitudes, locations.longitudes, demands, service_times, time_windows)
+
+def python_time_matrix(distance_matrix, vehicle_speed, service_times):
+    """Per-pair reference for vrpSolver.travel_time_matrix."""
+    metres_per_second = vehicle_speed / 3.6
+    distances = distance_matrix.tolist()
+    return [[math.ceil(service) + math.ceil(distance / metres_per_second) for distance in row]
+            for row, service in zip(distances, service_times.tolist())]
+
+def build_model(data, max_distance, native):
+    manager, routing = vrpSolver.build_model(
+        {key: value for key, value in data.items() if key not in ('time_matrix', 'vehicle_capacity')},
+        max_distance,
+    )
+    if native:
+        time_callback_index = routing.RegisterTransitMatrix(data["time_matrix"].tolist())
+        vrpSolver.add_constraint_dimensions(manager, routing, data, max_distance, time_callback_index)
+        return routing
+
+    time_lookup = data["time_matrix"].tolist()
+    demand_lookup = data["demands"].tolist()
+
+    def time_callback(from_index, to_index):
+        return time_lookup[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+
+    def demand_callback(from_index):
+        return demand_lookup[manager.IndexToNode(from_index)]
+
+    # Same dimensions in the same order as add_constraint_dimensions, with the vector swapped for a callback
+    demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
+    routing.AddDimension(demand_callback_index, 0, data["vehicle_capacity"], True, "Capacity")
+    time_callback_index = routing.RegisterTransitCallback(time_callback)
+    time_data = {key: value for key, value in data.items() if key != 'vehicle_capacity'}
+    vrpSolver.add_constraint_dimensions(manager, routing, time_data, max_distance, time_callback_index)
+    return routing
+
+def time_solve(data, max_distance, native, search_options):
+    start = time.perf_counter()
+    routing = build_model(data, max_distance, native)
+    solution = routing.SolveWithParameters(vrpSolver.build_search_parameters(**search_options))
+    elapsed = time.perf_counter() - start
+    return elapsed, solution.ObjectiveValue() if solution else None
+
+def best_of(repeat, function, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stops-per-vehicle', type=int, default=15,
+                        help="Fleet size is the number of stops divided by this")
+    parser.add_argument('--max-distance', type=int, default=1000000)
+    parser.add_argument('--vehicle-speed', type=float, default=vrpSolver.DEFAULT_VEHICLE_SPEED_KMH)
+    parser.add_argument('--solution-limit', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    search_options = {
+        'local_search_metaheuristic': 'GREEDY_DESCENT',
+        'solution_limit': args.solution_limit,
+    }
+    jsons_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jsons')
+    for dataset in DATASETS:
+        locations = with_synthetic_constraints(load_coordinates(os.path.join(jsons_dir, dataset)), args.seed)
+        num_vehicles = math.ceil((len(locations) - 1) / args.stops_per_vehicle)
+        # Enough capacity for the fleet with 30% to spare
+        vehicle_capacity = math.ceil(1.3 * locations.demands.sum() / num_vehicles)
+        data = vrpSolver.create_data_model(locations, num_vehicles, 0, use_cache=False,
+                                           vehicle_capacity=vehicle_capacity, vehicle_speed=args.vehicle_speed)
+        row = {
+            'dataset': dataset,
+            'num_vehicles': num_vehicles,
+            'vehicle_capacity': vehicle_capacity,
+            'solution_limit': args.solution_limit,
+            'time_matrix_numpy_seconds': best_of(args.repeat, vrpSolver.travel_time_matrix, data["distance_matrix"],
+                                                 args.vehicle_speed, data["service_times"]),
+            'time_matrix_python_seconds': best_of(args.repeat, python_time_matrix, data["distance_matrix"],
+                                                  args.vehicle_speed, data["service_times"]),
+        }
+        for name, native in (('callback', False), ('native', True)):
+            runs = [time_solve(data, args.max_distance, native, search_options) for _ in range(args.repeat)]
+            row[f'{name}_seconds'] = min(elapsed for elapsed, _ in runs)
+            row[f'{name}_objective'] = runs[0][1]
+        row['speedup'] = row['callback_seconds'] / row['native_seconds']
+        print(json.dumps(row))
+
+if __name__ == '__main__':
+    main()
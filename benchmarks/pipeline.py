@@ -0,0 +1,114 @@
+"""Per-stage benchmark of the solve pipeline.
+
+Times each stage separately: JSON load (read_json_file), distance matrix
+(calculate_distance_matrix), model build, search and result extraction. Runs on
+the bundled datasets plus synthetic 5k/10k point sets, for several vehicle
+counts, and writes the results as JSON.
+
+Datasets larger than --max-solve-size only run the load and matrix stages,
+since the full model for 10k points does not fit in memory on most hosts.
+
+Usage: python benchmarks/pipeline.py [--vehicles 5 20] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ortools
+import vrpSolver
+
+BUNDLED_DATASETS = ['locations_20.json', 'locations_200.json', 'locations_1000.json']
+SYNTHETIC_SIZES = [5000, 10000]
+
+def write_synthetic_dataset(directory, num_locations, seed=0):
+    """Writes random points around Athens in the same format as the bundled files."""
+    rng = random.Random(seed)
+    locations = [
+        {'Latitude': rng.uniform(37.85, 38.10), 'Longitude': rng.uniform(23.60, 23.90)}
+        for _ in range(num_locations)
+    ]
+    path = os.path.join(directory, f'synthetic_{num_locations}.json')
+    with open(path, 'w') as file:
+        json.dump({'Locations': locations}, file)
+    return path
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def benchmark(path, num_vehicles, max_distance, search_options, max_solve_size):
+    row = {'dataset': os.path.basename(path), 'num_vehicles': num_vehicles}
+    locations, row['load_seconds'] = timed(vrpSolver.read_json_file, path)
+    row['num_locations'] = len(locations)
+    matrix, row['matrix_seconds'] = timed(vrpSolver.calculate_distance_matrix, locations)
+    for stage in ('model_seconds', 'search_seconds', 'extract_seconds', 'objective'):
+        row[stage] = None
+    if len(locations) > max_solve_size:
+        return row
+
+    data = {'distance_matrix': matrix, 'num_vehicles': num_vehicles, 'depot': 0}
+    (manager, routing), row['model_seconds'] = timed(vrpSolver.build_model, data, max_distance)
+    search_parameters = vrpSolver.build_search_parameters(**search_options)
+    solution, row['search_seconds'] = timed(routing.SolveWithParameters, search_parameters)
+    if solution:
+        result, row['extract_seconds'] = timed(vrpSolver.extract_solution, data, manager, routing, solution)
+        row['objective'] = result['Objective']
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vehicles', type=int, nargs='+', default=[5, 20])
+    parser.add_argument('--max-distance', type=int, default=1000000)
+    parser.add_argument('--first-solution-strategy', choices=vrpSolver.FIRST_SOLUTION_STRATEGIES)
+    parser.add_argument('--local-search-metaheuristic', choices=vrpSolver.LOCAL_SEARCH_METAHEURISTICS,
+                        default='GREEDY_DESCENT')
+    parser.add_argument('--time-limit', type=float, default=10, help="Search time limit in seconds")
+    parser.add_argument('--solution-limit', type=int)
+    parser.add_argument('--max-solve-size', type=int, default=2000,
+                        help="Only time load and matrix stages for larger datasets")
+    parser.add_argument('--no-synthetic', action='store_true', help="Skip the 5k/10k synthetic datasets")
+    parser.add_argument('--output', help="Write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    search_options = {
+        'first_solution_strategy': args.first_solution_strategy,
+        'local_search_metaheuristic': args.local_search_metaheuristic,
+        'time_limit': args.time_limit,
+        'solution_limit': args.solution_limit,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(ROOT, 'jsons', name) for name in BUNDLED_DATASETS]
+        if not args.no_synthetic:
+            paths += [write_synthetic_dataset(tmp, size) for size in SYNTHETIC_SIZES]
+        for path in paths:
+            for num_vehicles in args.vehicles:
+                row = benchmark(path, num_vehicles, args.max_distance, search_options, args.max_solve_size)
+                print(json.dumps(row), file=sys.stderr)
+                results.append(row)
+
+    report = {
+        'python': platform.python_version(),
+        'ortools': ortools.__version__,
+        'cpu_count': os.cpu_count(),
+        'search_options': search_options,
+        'max_distance': args.max_distance,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
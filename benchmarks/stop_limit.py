@@ -0,0 +1,70 @@
+"""Search time with and without the stop limit that live progress pages rely on.
+
+Every solve started from the website gets a stop limit (vrpSolver.StopLimit),
+so that its Stop button works. This solves the same problem with a solution
+limit, so every solve does the same work, and compares the search time with
+no stop event, a local threading.Event and a multiprocessing Manager Event
+like the one the solver pool hands out. The variants are interleaved over
+several rounds so drift in machine load hits all of them alike.
+
+Usage: python benchmarks/stop_limit.py [--dataset locations_200.json] [--solution-limit 300] [--rounds 3]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vrpSolver
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dataset', default='locations_200.json')
+    parser.add_argument('--vehicles', type=int, default=10)
+    parser.add_argument('--max-distance', type=int, default=3000000)
+    parser.add_argument('--solution-limit', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--output', help="Write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jsons', args.dataset)
+    search_options = {'local_search_metaheuristic': 'GUIDED_LOCAL_SEARCH', 'solution_limit': args.solution_limit}
+    manager = multiprocessing.Manager()
+    variants = {'none': lambda: None, 'thread_event': threading.Event, 'manager_event': manager.Event}
+    seconds = {name: [] for name in variants}
+    objectives = {name: set() for name in variants}
+    for _ in range(args.rounds):
+        for name, make_event in variants.items():
+            result, stats = vrpSolver.run(path, args.vehicles, 0, args.max_distance, search_options,
+                                          stop_event=make_event())
+            seconds[name].append(stats['search_seconds'])
+            objectives[name].add(result and result['Objective'])
+            print(json.dumps({'variant': name, 'search_seconds': stats['search_seconds']}), file=sys.stderr)
+    manager.shutdown()
+
+    baseline = statistics.median(seconds['none'])
+    report = {
+        'dataset': args.dataset,
+        'search_options': search_options,
+        'results': [{
+            'variant': name,
+            'median_search_seconds': statistics.median(times),
+            'relative_to_none': statistics.median(times) / baseline,
+            'min_search_seconds': min(times),
+            'max_search_seconds': max(times),
+            # Same work in every variant, so this should be a single objective
+            'objectives': sorted(objectives[name], key=str),
+        } for name, times in seconds.items()],
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
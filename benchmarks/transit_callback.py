@@ -0,0 +1,71 @@
+"""Compare the Python transit callback against the native transit matrix.
+
+Both models are built from the same distance matrix and searched with the same
+deterministic parameters, so they visit the same solutions and only the cost
+of evaluating arcs differs.
+
+Usage: python benchmarks/transit_callback.py [--solution-limit N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ortools.constraint_solver import pywrapcp
+import vrpSolver
+
+DATASETS = ['locations_200.json', 'locations_1000.json']
+
+def build_model(data, max_distance, native):
+    manager = pywrapcp.RoutingIndexManager(
+        len(data["distance_matrix"]), data["num_vehicles"], data["depot"]
+    )
+    routing = pywrapcp.RoutingModel(manager)
+    distance_lookup = data["distance_matrix"].tolist()
+    if native:
+        transit_callback_index = routing.RegisterTransitMatrix(distance_lookup)
+    else:
+        def distance_callback(from_index, to_index):
+            return distance_lookup[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+    routing.AddDimension(transit_callback_index, 0, max_distance, True, "Distance")
+    routing.GetDimensionOrDie("Distance").SetGlobalSpanCostCoefficient(100)
+    return routing
+
+def time_solve(data, max_distance, native, search_options):
+    start = time.perf_counter()
+    routing = build_model(data, max_distance, native)
+    solution = routing.SolveWithParameters(vrpSolver.build_search_parameters(**search_options))
+    elapsed = time.perf_counter() - start
+    return elapsed, solution.ObjectiveValue() if solution else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--num-vehicles', type=int, default=10)
+    parser.add_argument('--max-distance', type=int, default=1000000)
+    parser.add_argument('--solution-limit', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    search_options = {
+        'local_search_metaheuristic': 'GREEDY_DESCENT',
+        'solution_limit': args.solution_limit,
+    }
+    jsons_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jsons')
+    for dataset in DATASETS:
+        locations = vrpSolver.read_json_file(os.path.join(jsons_dir, dataset))
+        data = vrpSolver.create_data_model(locations, args.num_vehicles, 0, use_cache=False)
+        row = {'dataset': dataset, 'num_vehicles': args.num_vehicles, 'solution_limit': args.solution_limit}
+        for name, native in (('callback', False), ('matrix', True)):
+            runs = [time_solve(data, args.max_distance, native, search_options) for _ in range(args.repeat)]
+            row[f'{name}_seconds'] = min(elapsed for elapsed, _ in runs)
+            row[f'{name}_objective'] = runs[0][1]
+        row['speedup'] = row['callback_seconds'] / row['matrix_seconds']
+        print(json.dumps(row))
+
+if __name__ == '__main__':
+    main()
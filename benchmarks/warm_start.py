@@ -0,0 +1,108 @@
+"""Time to equal quality of warm-started re-solves against cold solves.
+
+For each dataset a base problem is solved cold, as a previous run would have
+been. The problem is then edited (one more vehicle, or a relaxed max distance)
+and solved twice with the same time limit: cold, and warm-started from the base
+routes. The report gives the objective the cold solve ends with and how long
+each solve took to first reach it.
+
+Usage: python benchmarks/warm_start.py [--time-limit 20] [--output results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vrpSolver
+from datasets import load_coordinates
+
+DATASETS = ['locations_200.json', 'locations_1000.json']
+EDITS = ['add_vehicle', 'relax_max_distance']
+
+def edited(num_vehicles, max_distance, edit):
+    if edit == 'add_vehicle':
+        return num_vehicles + 1, max_distance
+    return num_vehicles, int(max_distance * 1.05)
+
+def trace_solve(data, max_distance, search_options, initial_routes=None):
+    """Solve and record (seconds, objective) for every improving solution."""
+    manager, routing = vrpSolver.build_model(data, max_distance)
+    search_parameters = vrpSolver.build_search_parameters(**search_options)
+    trace = []
+    start = time.perf_counter()
+
+    def record():
+        trace.append((time.perf_counter() - start, routing.CostVar().Max()))
+
+    routing.AddAtSolutionCallback(record)
+    solution, warm_started = vrpSolver.search(routing, search_parameters, initial_routes)
+    if not solution:
+        return None, warm_started, trace
+    return vrpSolver.extract_solution(data, manager, routing, solution), warm_started, trace
+
+def time_to_reach(trace, objective):
+    return next((seconds for seconds, value in trace if value <= objective), None)
+
+def benchmark(path, num_vehicles, max_distance, edit, search_options):
+    locations = load_coordinates(path)
+    data = vrpSolver.create_data_model(locations, num_vehicles, 0, use_cache=False)
+    base, _, _ = trace_solve(data, max_distance, search_options)
+    row = {'dataset': os.path.basename(path), 'edit': edit, 'base_objective': base and base['Objective']}
+    if base is None:
+        return row
+
+    data['num_vehicles'], edited_max_distance = edited(num_vehicles, max_distance, edit)
+    cold, _, cold_trace = trace_solve(data, edited_max_distance, search_options)
+    initial_routes = vrpSolver.initial_routes_from(base['Routes'], data['num_vehicles'], 0, len(locations))
+    warm, warm_started, warm_trace = trace_solve(data, edited_max_distance, search_options, initial_routes)
+
+    target = cold['Objective'] if cold else None
+    row.update({
+        'cold_objective': target,
+        'cold_seconds_to_target': time_to_reach(cold_trace, target) if cold else None,
+        'warm_started': warm_started,
+        'warm_objective': warm and warm['Objective'],
+        'warm_seconds_to_target': time_to_reach(warm_trace, target) if cold else None,
+        'warm_first_solution_objective': warm_trace[0][1] if warm_trace else None,
+    })
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vehicles', type=int, default=5)
+    parser.add_argument('--max-distance', type=int, default=150000)
+    parser.add_argument('--local-search-metaheuristic', choices=vrpSolver.LOCAL_SEARCH_METAHEURISTICS,
+                        default='GUIDED_LOCAL_SEARCH')
+    parser.add_argument('--time-limit', type=float, default=20, help="Search time limit per solve, in seconds")
+    parser.add_argument('--output', help="Write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    search_options = {
+        'local_search_metaheuristic': args.local_search_metaheuristic,
+        'time_limit': args.time_limit,
+    }
+    jsons_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jsons')
+    results = []
+    for dataset in DATASETS:
+        for edit in EDITS:
+            row = benchmark(os.path.join(jsons_dir, dataset), args.vehicles, args.max_distance, edit, search_options)
+            print(json.dumps(row), file=sys.stderr)
+            results.append(row)
+
+    report = {
+        'vehicles': args.vehicles,
+        'max_distance': args.max_distance,
+        'search_options': search_options,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import math
+import numpy as np
+from ortools.constraint_solver import pywrapcp
+from vrpSolver import haversine_distance, add_distance_costs, add_constraint_dimensions
+from decomposition import sweep_clusters
+
+EARTH_RADIUS_M = 6371000.0
+
+def project(latitudes, longitudes):
+    """Equirectangular projection to metres around the mean latitude.
+
+    Close enough to haversine distances over a city or region to pick nearest
+    neighbours; the arc costs themselves are always exact haversine values.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    x = EARTH_RADIUS_M * math.cos(float(lat.mean())) * lon
+    y = EARTH_RADIUS_M * lat
+    return x, y
+
+def nearest_neighbors(latitudes, longitudes, k):
+    """Indices of the k nearest other locations of every location, nearest first.
+
+    Uses a uniform grid over the projected coordinates sized for about k points
+    per cell. Each cell's points are compared only against the surrounding
+    block of cells, which is widened until it is guaranteed to hold the k
+    nearest points, so the result is exact for the projection without ever
+    building an N x N array. Returns an (N, k) int32 array.
+    """
+    x, y = project(latitudes, longitudes)
+    num_locations = x.shape[0]
+    k = min(k, num_locations - 1)
+    neighbors = np.empty((num_locations, k), dtype=np.int32)
+    if k <= 0:
+        return neighbors
+
+    width = max(float(x.max() - x.min()), float(y.max() - y.min()), 1.0)
+    cells_per_side = max(1, int(math.sqrt(num_locations / k)))
+    cell_size = width / cells_per_side
+    cell_x = np.minimum(((x - x.min()) / cell_size).astype(np.int64), cells_per_side - 1)
+    cell_y = np.minimum(((y - y.min()) / cell_size).astype(np.int64), cells_per_side - 1)
+    cell_ids = cell_x * cells_per_side + cell_y
+
+    # Points grouped by cell: cell c holds order[starts[c]:starts[c + 1]]
+    order = np.argsort(cell_ids, kind='stable')
+    starts = np.searchsorted(cell_ids[order], np.arange(cells_per_side * cells_per_side + 1))
+
+    def block(cx, cy, ring):
+        xs = range(max(cx - ring, 0), min(cx + ring, cells_per_side - 1) + 1)
+        ys = range(max(cy - ring, 0), min(cy + ring, cells_per_side - 1) + 1)
+        return np.concatenate([
+            order[starts[i * cells_per_side + ys[0]]:starts[i * cells_per_side + ys[-1] + 1]] for i in xs
+        ])
+
+    for cell in np.unique(cell_ids):
+        members = order[starts[cell]:starts[cell + 1]]
+        cx, cy = divmod(int(cell), cells_per_side)
+        ring = 1
+        while True:
+            candidates = block(cx, cy, ring)
+            covers_everything = ring >= cells_per_side
+            if len(candidates) > k or covers_everything:
+                dx = x[members, None] - x[candidates]
+                dy = y[members, None] - y[candidates]
+                squared = dx * dx + dy * dy
+                squared[members[:, None] == candidates] = np.inf  # a point is not its own neighbour
+                nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+                nearest_squared = np.take_along_axis(squared, nearest, axis=1)
+                # Anything outside the block is at least `ring` cells away
+                if covers_everything or nearest_squared.max() <= (ring * cell_size) ** 2:
+                    by_distance = np.argsort(nearest_squared, axis=1, kind='stable')
+                    neighbors[members] = candidates[np.take_along_axis(nearest, by_distance, axis=1)]
+                    break
+            ring += 1
+    return neighbors
+
+def haversine_pair_distances(latitudes1, longitudes1, latitudes2, longitudes2):
+    """Element-wise haversine distances in integer metres, same values as haversine_distance."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(values, dtype=np.float64))
+                              for values in (latitudes1, longitudes1, latitudes2, longitudes2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return np.rint(1000 * (6371 * c)).astype(np.int32)
+
+class CandidateGraph:
+    """Sparse distance lookup over the k nearest neighbours of every location.
+
+    Holds N * k arc lengths instead of an N x N matrix. distance() serves the
+    candidate arcs from that table and computes any other arc on demand, with
+    the same integer haversine values as the dense matrix.
+    """
+
+    def __init__(self, latitudes, longitudes, k):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.neighbors = nearest_neighbors(self.latitudes, self.longitudes, k)
+        self.lengths = haversine_pair_distances(
+            self.latitudes[:, None], self.longitudes[:, None],
+            self.latitudes[self.neighbors], self.longitudes[self.neighbors],
+        )
+        # Per-node dicts keep the callback's lookups in plain Python
+        self._lookup = [dict(zip(row, lengths)) for row, lengths in zip(self.neighbors.tolist(), self.lengths.tolist())]
+        self._coordinates = list(zip(self.latitudes.tolist(), self.longitudes.tolist()))
+
+    def __len__(self):
+        return len(self._coordinates)
+
+    def distance(self, from_node, to_node):
+        known = self._lookup[from_node].get(to_node)
+        if known is not None:
+            return known
+        if from_node == to_node:
+            return 0
+        return haversine_distance(*self._coordinates[from_node], *self._coordinates[to_node])
+
+def construct_routes(graph, num_vehicles, depot, time_windows=None, demands=None):
+    """Initial routes for the sparse model: one sweep sector per vehicle, each
+    visited in nearest-neighbour order starting from the depot.
+
+    With demands the sectors are balanced by load rather than by stop count,
+    and with time windows each step picks the nearest of the stops whose
+    window opens first, so the routes follow the windows.
+    """
+    x, y = project(graph.latitudes, graph.longitudes)
+    routes = []
+    for sector in sweep_clusters(graph.latitudes, graph.longitudes, depot, num_vehicles, demands):
+        route = []
+        current = depot
+        remaining = np.ones(len(sector), dtype=bool)
+        while remaining.any():
+            candidates = np.flatnonzero(remaining)
+            if time_windows is not None:
+                opens = time_windows[sector[candidates], 0]
+                candidates = candidates[opens == opens.min()]
+            squared = (x[sector[candidates]] - x[current]) ** 2 + (y[sector[candidates]] - y[current]) ** 2
+            nearest = candidates[np.argmin(squared)]
+            remaining[nearest] = False
+            current = int(sector[nearest])
+            route.append(current)
+        routes.append(route)
+    return routes
+
+def build_sparse_model(graph, data, max_distance, initial_routes):
+    """Routing model whose arcs are limited to the candidate graph.
+
+    Each stop may only be followed by one of its k nearest neighbours or by the
+    end of a route (a return to the depot). The arcs of initial_routes are
+    allowed as well, so the search can always start from them. Arc costs come
+    from a transit callback over the candidate graph, so no N x N matrix is
+    ever built; travel times for time windows come from the same lookups.
+    `data` holds num_vehicles, depot and vrpSolver.constraint_data.
+    """
+    num_vehicles, depot = data["num_vehicles"], data["depot"]
+    manager = pywrapcp.RoutingIndexManager(len(graph), num_vehicles, depot)
+    routing = pywrapcp.RoutingModel(manager)
+
+    def distance_callback(from_index, to_index):
+        return graph.distance(manager.IndexToNode(from_index), manager.IndexToNode(to_index))
+
+    transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    add_distance_costs(routing, transit_callback_index, max_distance)
+
+    time_callback_index = None
+    if "time_windows" in data:
+        metres_per_second = data["vehicle_speed"] / 3.6
+        service_times = data["service_times"].tolist()
+
+        def time_callback(from_index, to_index):
+            from_node = manager.IndexToNode(from_index)
+            travel = graph.distance(from_node, manager.IndexToNode(to_index))
+            return service_times[from_node] + math.ceil(travel / metres_per_second)
+
+        time_callback_index = routing.RegisterTransitCallback(time_callback)
+    add_constraint_dimensions(manager, routing, data, max_distance, time_callback_index)
+
+    successors = {}
+    for route in initial_routes or []:
+        for node, next_node in zip(route, route[1:]):
+            successors[node] = next_node
+    ends = [routing.End(vehicle) for vehicle in range(num_vehicles)]
+    for node, neighbors in enumerate(graph.neighbors.tolist()):
+        if node == depot:
+            continue
+        allowed = {neighbor for neighbor in neighbors if neighbor != depot}
+        if node in successors:
+            allowed.add(successors[node])
+        routing.NextVar(manager.NodeToIndex(node)).SetValues(
+            [manager.NodeToIndex(neighbor) for neighbor in allowed] + ends
+        )
+    return manager, routing
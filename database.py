@@ -1,40 +1,205 @@
+import os
 import sqlite3
+import threading
+import weakref
+import zlib
+
+DB_PATH = os.environ.get('VRP_DB_PATH', '/app/db/saastest.db')
+# Most solutions kept in solution_cache; the least recently used ones are evicted first
+SOLUTION_CACHE_MAX_ENTRIES = int(os.environ.get('VRP_SOLUTION_CACHE_MAX_ENTRIES', 1000))
+
+class ConnectionPool:
+    """Hands each thread its own long-lived SQLite connection.
+
+    A connection is bound to a thread on first use and goes back to the idle
+    list when the thread exits, so short-lived request threads reuse
+    connections instead of opening new ones. Keeping connections open also
+    keeps sqlite3's per-connection prepared statement cache warm. Every
+    connection runs in WAL mode, so readers don't block behind solver result
+    writes.
+    """
+
+    def __init__(self, path, max_idle=16):
+        self.path = path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        # check_same_thread=False because a connection may be reused by a later thread
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')  # Safe with WAL, fsyncs only at checkpoints
+        conn.execute('PRAGMA cache_size = -32000')  # 32 MB page cache
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    def connection(self):
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._connect()
+            holder = _ConnectionHolder(conn)
+            # Runs once the thread's locals are gone, i.e. when the thread exits
+            weakref.finalize(holder, self._release, conn)
+            self._local.holder = holder
+        conn = holder.conn
+        if conn.in_transaction:
+            # A previous call on this thread failed half way through
+            conn.rollback()
+        return conn
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+class _ConnectionHolder:
+    def __init__(self, conn):
+        self.conn = conn
+
+connection_pool = ConnectionPool(DB_PATH)
 
 def get_db_connection():
-    conn = sqlite3.connect('/app/db/saastest.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    return connection_pool.connection()
+
+def init_db():
+    """Create the tables and indexes added on top of the original schema."""
+    conn = get_db_connection()
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS solver_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            submission_id INTEGER NOT NULL, -- The vrp_problems row to solve
+            status TEXT NOT NULL DEFAULT 'Queued', -- Queued, Running, Done, Failed
+            attempts INTEGER NOT NULL DEFAULT 0, -- How many times a worker picked the job up
+            error TEXT, -- Error message if the job failed
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME,
+            FOREIGN KEY(submission_id) REFERENCES vrp_problems(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_solver_jobs_status ON solver_jobs (status, id);
+        CREATE INDEX IF NOT EXISTS idx_solver_jobs_submission ON solver_jobs (submission_id, id);
+        -- Dashboard listings, newest first
+        CREATE INDEX IF NOT EXISTS idx_vrp_problems_user_created ON vrp_problems (user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_vrp_problems_status_created ON vrp_problems (status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_vrp_problems_created ON vrp_problems (created_at);
+        CREATE TABLE IF NOT EXISTS submission_outputs (
+            submission_id INTEGER PRIMARY KEY, -- The vrp_problems row these outputs belong to
+            routes BLOB, -- zlib-compressed routes JSON
+            result BLOB, -- zlib-compressed solver result (JSON, or an error message)
+            FOREIGN KEY(submission_id) REFERENCES vrp_problems(id)
+        );
+        CREATE TABLE IF NOT EXISTS datasets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL, -- The user who uploaded the dataset
+            name TEXT, -- Original file name
+            content_hash TEXT NOT NULL, -- sha256 of the coordinates, names the stored .npy file
+            num_locations INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        );
+        -- One row per user and content: re-uploading the same points reuses it
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_datasets_user_hash ON datasets (user_id, content_hash);
+        CREATE TABLE IF NOT EXISTS solution_cache (
+            problem_key TEXT PRIMARY KEY, -- sha256 of the coordinates, problem parameters and search options
+            submission_id INTEGER, -- The submission whose solve produced the entry
+            objective_value INTEGER,
+            max_route_distance INTEGER,
+            solver_time REAL, -- Search time of the original solve, in seconds
+            stats TEXT, -- Stage timings/statistics of the original solve
+            routes BLOB, -- zlib-compressed routes JSON
+            result BLOB, -- zlib-compressed solver result JSON
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_used_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_solution_cache_last_used ON solution_cache (last_used_at);
+        CREATE TABLE IF NOT EXISTS batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL, -- The user who submitted the batch
+            name TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        );
+    ''')
+    add_column_if_missing(conn, 'vrp_problems', 'max_route_distance', 'INTEGER DEFAULT NULL')
+    # Search options, NULL means the solver default
+    add_column_if_missing(conn, 'vrp_problems', 'first_solution_strategy', 'TEXT DEFAULT NULL')
+    add_column_if_missing(conn, 'vrp_problems', 'local_search_metaheuristic', 'TEXT DEFAULT NULL')
+    add_column_if_missing(conn, 'vrp_problems', 'time_limit', 'INTEGER DEFAULT NULL')  # Seconds
+    add_column_if_missing(conn, 'vrp_problems', 'solution_limit', 'INTEGER DEFAULT NULL')
+    # Re-runs start the search from the submission's previous routes
+    add_column_if_missing(conn, 'vrp_problems', 'warm_start', 'INTEGER NOT NULL DEFAULT 1')
+    # Sparse mode: number of nearest neighbours kept as candidate arcs, NULL for the full matrix
+    add_column_if_missing(conn, 'vrp_problems', 'candidate_neighbors', 'INTEGER DEFAULT NULL')
+    # Number of differently configured searches run in parallel, NULL for a single search
+    add_column_if_missing(conn, 'vrp_problems', 'portfolio_size', 'INTEGER DEFAULT NULL')
+    # Capacity per vehicle and average speed in km/h, NULL for no capacity limit / the default speed
+    add_column_if_missing(conn, 'vrp_problems', 'vehicle_capacity', 'INTEGER DEFAULT NULL')
+    add_column_if_missing(conn, 'vrp_problems', 'vehicle_speed', 'REAL DEFAULT NULL')
+    # Per-run instrumentation: search time in seconds (billed) and a JSON object of stage timings/statistics
+    add_column_if_missing(conn, 'vrp_problems', 'solver_time', 'REAL DEFAULT NULL')
+    add_column_if_missing(conn, 'vrp_problems', 'stats', 'TEXT DEFAULT NULL')
+    # Uploaded dataset to solve on; when set, locations is 0
+    add_column_if_missing(conn, 'vrp_problems', 'dataset_id', 'INTEGER DEFAULT NULL REFERENCES datasets(id)')
+    # 1 if the results were served from solution_cache, with the submission that was actually solved
+    add_column_if_missing(conn, 'vrp_problems', 'cache_hit', 'INTEGER DEFAULT NULL')
+    add_column_if_missing(conn, 'vrp_problems', 'cache_source_id', 'INTEGER DEFAULT NULL')
+    # Batch the submission was created in through the batch API, NULL for single submissions
+    add_column_if_missing(conn, 'vrp_problems', 'batch_id', 'INTEGER DEFAULT NULL REFERENCES batches(id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_vrp_problems_batch ON vrp_problems (batch_id, id)')
+    # Skip the solution cache lookup for this run
+    add_column_if_missing(conn, 'solver_jobs', 'force_resolve', 'INTEGER NOT NULL DEFAULT 0')
+    move_outputs_out_of_vrp_problems(conn)
+    conn.commit()
+
+def move_outputs_out_of_vrp_problems(conn):
+    """Move routes/result written by older versions into submission_outputs."""
+    rows = conn.execute(
+        'SELECT id, routes, result FROM vrp_problems WHERE routes IS NOT NULL OR result IS NOT NULL'
+    ).fetchall()
+    for row in rows:
+        save_submission_outputs(conn, row['id'], row['routes'], row['result'])
+    if rows:
+        conn.execute('UPDATE vrp_problems SET routes = NULL, result = NULL WHERE routes IS NOT NULL OR result IS NOT NULL')
+
+def add_column_if_missing(conn, table, column, definition):
+    columns = [row['name'] for row in conn.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
 
 # Fetch user by username
 def fetch_user_by_username(username):
     conn = get_db_connection()
     user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-    conn.close()
     return user
 
 # Fetch user by ID
 def fetch_user_by_id(user_id):
     conn = get_db_connection()
     user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-    conn.close()
     return user
 
 def fetch_username_by_id(user_id):
     conn = get_db_connection()
     user = conn.execute('SELECT username FROM users WHERE id = ?', (user_id,)).fetchone()
-    conn.close()
     return user['username']
 
 def update_credits_by_id(user_id, new_credits):
     """Update the credits for a user in the database."""
     conn = get_db_connection()
-    
-    try:
-        # Update the credits in the user_credits table
-        conn.execute('UPDATE users SET credits = ? WHERE id = ?', (new_credits, user_id))
-        conn.commit()
-    finally:
-        conn.close()
+    # Update the credits in the user_credits table
+    conn.execute('UPDATE users SET credits = ? WHERE id = ?', (new_credits, user_id))
+    conn.commit()
 
 # Insert a new problem into the database
 def insert_problem(user_id, num_vehicles, depot, max_distance, locations, status):
@@ -45,7 +210,6 @@ def insert_problem(user_id, num_vehicles, depot, max_distance, locations, status
     ''', (user_id, num_vehicles, depot, max_distance, locations, status))
     conn.commit()
     problem_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
-    conn.close()
     return problem_id
 
 def update_vrp_problem(submission_id, num_vehicles, depot, max_distance, locations):
@@ -56,7 +220,6 @@ def update_vrp_problem(submission_id, num_vehicles, depot, max_distance, locatio
         WHERE id = ?
     ''', (num_vehicles, depot, max_distance, locations, submission_id))
     conn.commit()
-    conn.close()
     
 def update_submission_in_db(submission_id, num_vehicles, depot, max_distance, locations_json, status):
     conn = get_db_connection()
@@ -66,13 +229,11 @@ def update_submission_in_db(submission_id, num_vehicles, depot, max_distance, lo
         WHERE id = ?
     ''', (num_vehicles, depot, max_distance, locations_json, submission_id, status))
     conn.commit()
-    conn.close()
 
 # Fetch submission by ID
 def fetch_submission_by_id(submission_id):
     conn = get_db_connection()
     submission = conn.execute('SELECT * FROM vrp_problems WHERE id = ?', (submission_id,)).fetchone()
-    conn.close()
     return submission
 
 # Fetch all submissions or submissions by a specific user
@@ -82,19 +243,145 @@ def fetch_submissions(user_id=None, admin=False):
         submissions = conn.execute('SELECT * FROM vrp_problems ORDER BY created_at DESC').fetchall()
     else:
         submissions = conn.execute('SELECT * FROM vrp_problems WHERE user_id = ? ORDER BY created_at DESC', (user_id,)).fetchall()
-    conn.close()
     return submissions
 
-def update_problem(submission_id, num_vehicles, depot, max_distance, locations, status, name):
+# Columns the dashboards need; leaves out the large routes/result blobs
+SUBMISSION_SUMMARY_COLUMNS = 'p.id, p.name, p.status, p.created_at, p.user_id, u.username'
+
+def fetch_submission_page(user_id=None, admin=False, status=None, before=None, limit=50):
+    """Fetch one page of submission summaries, newest first.
+
+    Uses keyset pagination: `before` is the (created_at, id) of the last row of
+    the previous page, so each page is an index range scan no matter how deep
+    it is. Returns (rows, cursor) where cursor is the `before` value for the
+    next page, or None if this was the last page.
+    """
+    conditions = []
+    params = []
+    if not admin:
+        conditions.append('p.user_id = ?')
+        params.append(user_id)
+    if status is not None:
+        conditions.append('p.status = ?')
+        params.append(status)
+    if before is not None:
+        conditions.append('(p.created_at, p.id) < (?, ?)')
+        params.extend(before)
+    query = f'SELECT {SUBMISSION_SUMMARY_COLUMNS} FROM vrp_problems p LEFT JOIN users u ON u.id = p.user_id'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY p.created_at DESC, p.id DESC LIMIT ?'
+    # Fetch one extra row to know whether another page follows
+    params.append(limit + 1)
+
+    conn = get_db_connection()
+    rows = conn.execute(query, params).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]['created_at'], rows[-1]['id'])
+
+def update_problem(submission_id, num_vehicles, depot, max_distance, locations, status, name, dataset_id=None):
+    conn = get_db_connection()
+    conn.execute('''
+        UPDATE vrp_problems
+        SET num_vehicles = ?, depot = ?, max_distance = ?, locations = ?, status = ?, updated_at = CURRENT_TIMESTAMP, name = ?,
+            dataset_id = ?
+        WHERE id = ?
+    ''', (num_vehicles, depot, max_distance, locations, status, name, dataset_id, submission_id))
+    conn.commit()
+
+def update_search_options(submission_id, first_solution_strategy, local_search_metaheuristic, time_limit, solution_limit,
+                          warm_start=True, candidate_neighbors=None, portfolio_size=None):
     conn = get_db_connection()
     conn.execute('''
         UPDATE vrp_problems
-        SET num_vehicles = ?, depot = ?, max_distance = ?, locations = ?, status = ?, updated_at = CURRENT_TIMESTAMP, name = ?
+        SET first_solution_strategy = ?, local_search_metaheuristic = ?, time_limit = ?, solution_limit = ?,
+            warm_start = ?, candidate_neighbors = ?, portfolio_size = ?, updated_at = CURRENT_TIMESTAMP
         WHERE id = ?
-    ''', (num_vehicles, depot, max_distance, locations, status, name, submission_id))
+    ''', (first_solution_strategy, local_search_metaheuristic, time_limit, solution_limit, int(warm_start),
+          candidate_neighbors, portfolio_size, submission_id))
     conn.commit()
-    conn.close()
     
+def update_vehicle_constraints(submission_id, vehicle_capacity, vehicle_speed):
+    conn = get_db_connection()
+    conn.execute('''
+        UPDATE vrp_problems
+        SET vehicle_capacity = ?, vehicle_speed = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (vehicle_capacity, vehicle_speed, submission_id))
+    conn.commit()
+
+# Per-variant columns a batch can set on its submissions
+BATCH_PROBLEM_COLUMNS = (
+    'num_vehicles', 'depot', 'max_distance', 'first_solution_strategy', 'local_search_metaheuristic',
+    'time_limit', 'solution_limit', 'candidate_neighbors', 'portfolio_size', 'vehicle_capacity', 'vehicle_speed',
+)
+
+def insert_batch(user_id, name, locations, dataset_id, variants):
+    """Create a batch with one queued submission and solver job per variant, in a single transaction.
+
+    variants are dicts keyed by BATCH_PROBLEM_COLUMNS (missing keys are NULL).
+    Returns (batch_id, submission_ids) with the ids in variant order.
+    """
+    conn = get_db_connection()
+    columns = ', '.join(BATCH_PROBLEM_COLUMNS)
+    placeholders = ', '.join('?' for _ in BATCH_PROBLEM_COLUMNS)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        batch_id = conn.execute('INSERT INTO batches (user_id, name) VALUES (?, ?)', (user_id, name)).lastrowid
+        conn.executemany(f'''
+            INSERT INTO vrp_problems (user_id, name, locations, dataset_id, batch_id, status, {columns})
+            VALUES (?, ?, ?, ?, ?, 'Queued', {placeholders})
+        ''', [
+            (user_id, f'{name} #{number}', locations, dataset_id, batch_id)
+            + tuple(variant.get(column) for column in BATCH_PROBLEM_COLUMNS)
+            for number, variant in enumerate(variants, start=1)
+        ])
+        submission_ids = [row['id'] for row in conn.execute(
+            'SELECT id FROM vrp_problems WHERE batch_id = ? ORDER BY id', (batch_id,)
+        )]
+        conn.executemany(
+            'INSERT INTO solver_jobs (submission_id) VALUES (?)', [(submission_id,) for submission_id in submission_ids]
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return batch_id, submission_ids
+
+def fetch_batch_by_id(batch_id):
+    conn = get_db_connection()
+    return conn.execute('SELECT * FROM batches WHERE id = ?', (batch_id,)).fetchone()
+
+def fetch_batch_submissions(batch_id):
+    """The batch's submissions in variant order, without their stored outputs."""
+    conn = get_db_connection()
+    return conn.execute('SELECT * FROM vrp_problems WHERE batch_id = ? ORDER BY id', (batch_id,)).fetchall()
+
+def insert_dataset(user_id, name, content_hash, num_locations):
+    """Record an uploaded dataset and return its id; an identical upload by the same user returns the existing id."""
+    conn = get_db_connection()
+    conn.execute('''
+        INSERT OR IGNORE INTO datasets (user_id, name, content_hash, num_locations)
+        VALUES (?, ?, ?, ?)
+    ''', (user_id, name, content_hash, num_locations))
+    conn.commit()
+    row = conn.execute(
+        'SELECT id FROM datasets WHERE user_id = ? AND content_hash = ?', (user_id, content_hash)
+    ).fetchone()
+    return row['id']
+
+def fetch_dataset_by_id(dataset_id):
+    conn = get_db_connection()
+    return conn.execute('SELECT * FROM datasets WHERE id = ?', (dataset_id,)).fetchone()
+
+def fetch_datasets_by_user(user_id):
+    conn = get_db_connection()
+    return conn.execute(
+        'SELECT * FROM datasets WHERE user_id = ? ORDER BY created_at DESC, id DESC', (user_id,)
+    ).fetchall()
+
 def execute_query(query, params=None):
     conn = get_db_connection() # Replace with your database name or connection
     cursor = conn.cursor()
@@ -103,7 +390,6 @@ def execute_query(query, params=None):
     else:
         cursor.execute(query)
     conn.commit()
-    conn.close()
 
 def update_submission_results(
     submission_id,
@@ -113,19 +399,26 @@ def update_submission_results(
     success=None,
     status=None,
     execution_time=None,
-    credits=None
+    credits=None,
+    max_route_distance=None,
+    solver_time=None,
+    stats=None,
+    cache_hit=None,
+    cache_source_id=None,
+    clear_solution=False
 ):
+    """Store a run's results; None leaves a column unchanged.
+
+    clear_solution drops the objective, maximum route distance and routes of
+    an earlier run, for a run that ended without a solution.
+    """
     query = "UPDATE vrp_problems SET updated_at = CURRENT_TIMESTAMP"
     params = []
+    if clear_solution:
+        query += ", objective_value = NULL, max_route_distance = NULL"
     if objective_value is not None:
         query += ", objective_value = ?"
         params.append(objective_value)
-    if routes is not None:
-        query += ", routes = ?"
-        params.append(routes)
-    if result is not None:
-        query += ", result = ?"
-        params.append(result)
     if success is not None:
         query += ", success = ?"
         params.append(success)
@@ -138,12 +431,85 @@ def update_submission_results(
     if credits is not None:
         query += ", credits = ?"
         params.append(credits)
+    if max_route_distance is not None:
+        query += ", max_route_distance = ?"
+        params.append(max_route_distance)
+    if solver_time is not None:
+        query += ", solver_time = ?"
+        params.append(solver_time)
+    if stats is not None:
+        query += ", stats = ?"
+        params.append(stats)
+    if cache_hit is not None:
+        query += ", cache_hit = ?, cache_source_id = ?"
+        params.extend([cache_hit, cache_source_id])
     query += " WHERE id = ?"
     params.append(submission_id)
-    # Execute the query with params
-    execute_query(query, params)
+    # Routes and the raw result go to submission_outputs, in the same transaction
+    conn = get_db_connection()
+    conn.execute(query, params)
+    if clear_solution:
+        conn.execute('UPDATE submission_outputs SET routes = NULL WHERE submission_id = ?', (submission_id,))
+    if routes is not None or result is not None:
+        save_submission_outputs(conn, submission_id, routes, result)
+    conn.commit()
+
+def compress_output(text):
+    return zlib.compress(text.encode('utf-8'), 6) if text is not None else None
+
+def decompress_output(blob):
+    return zlib.decompress(blob).decode('utf-8') if blob is not None else None
+
+def save_submission_outputs(conn, submission_id, routes=None, result=None):
+    """Store compressed routes/result for a submission; None leaves a value unchanged."""
+    conn.execute('''
+        INSERT INTO submission_outputs (submission_id, routes, result) VALUES (?, ?, ?)
+        ON CONFLICT(submission_id) DO UPDATE SET
+            routes = COALESCE(excluded.routes, routes),
+            result = COALESCE(excluded.result, result)
+    ''', (submission_id, compress_output(routes), compress_output(result)))
+
+def fetch_submission_output(submission_id, field):
+    """Load and decompress one large output ('routes' or 'result') of a submission."""
+    if field not in ('routes', 'result'):
+        raise ValueError(f"Unknown submission output: {field}")
+    conn = get_db_connection()
+    row = conn.execute(f'SELECT {field} FROM submission_outputs WHERE submission_id = ?', (submission_id,)).fetchone()
+    return decompress_output(row[field]) if row else None
+
+
+def fetch_cached_solution(problem_key):
+    """Look up a cached solution and mark it as used; None on a miss."""
+    conn = get_db_connection()
+    row = conn.execute('SELECT * FROM solution_cache WHERE problem_key = ?', (problem_key,)).fetchone()
+    if row is None:
+        return None
+    conn.execute('''
+        UPDATE solution_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP WHERE problem_key = ?
+    ''', (problem_key,))
+    conn.commit()
+    cached = dict(row)
+    cached['routes'] = decompress_output(row['routes'])
+    cached['result'] = decompress_output(row['result'])
+    return cached
+
+def save_cached_solution(problem_key, submission_id, objective_value, max_route_distance, solver_time, stats,
+                         routes, result, max_entries=SOLUTION_CACHE_MAX_ENTRIES):
+    """Store a solution under its problem key, evicting the least recently used entries over max_entries."""
+    conn = get_db_connection()
+    conn.execute('''
+        INSERT OR REPLACE INTO solution_cache
+            (problem_key, submission_id, objective_value, max_route_distance, solver_time, stats, routes, result)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (problem_key, submission_id, objective_value, max_route_distance, solver_time, stats,
+          compress_output(routes), compress_output(result)))
+    conn.execute('''
+        DELETE FROM solution_cache WHERE problem_key IN (
+            SELECT problem_key FROM solution_cache ORDER BY last_used_at DESC, rowid DESC LIMIT -1 OFFSET ?
+        )
+    ''', (max_entries,))
+    conn.commit()
 
-    
 def update_submission_result(submission_id, success=None, result=None, status=None):
     # This function can be similar to update_submission_results
     # but tailored for failure cases if needed
@@ -159,11 +525,72 @@ def update_submission_status(submission_id, status):
     conn = get_db_connection()
     conn.execute('UPDATE vrp_problems SET status = ? WHERE id = ?', (status, submission_id))
     conn.commit()
-    conn.close()
+
+# Enqueue a submission for the solver workers
+def enqueue_job(submission_id, force_resolve=False):
+    conn = get_db_connection()
+    conn.execute(
+        'INSERT INTO solver_jobs (submission_id, force_resolve) VALUES (?, ?)', (submission_id, int(force_resolve))
+    )
+    job_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+    conn.execute('''
+        UPDATE vrp_problems SET status = 'Queued', updated_at = CURRENT_TIMESTAMP WHERE id = ?
+    ''', (submission_id,))
+    conn.commit()
+    return job_id
+
+def claim_next_job():
+    """Atomically move the oldest queued job (and its submission) to Running."""
+    conn = get_db_connection()
+    try:
+        # IMMEDIATE takes the write lock up front so two workers can't claim the same job
+        conn.execute('BEGIN IMMEDIATE')
+        job = conn.execute(
+            "SELECT * FROM solver_jobs WHERE status = 'Queued' ORDER BY id LIMIT 1"
+        ).fetchone()
+        if job is not None:
+            conn.execute('''
+                UPDATE solver_jobs
+                SET status = 'Running', attempts = attempts + 1, started_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (job['id'],))
+            conn.execute('''
+                UPDATE vrp_problems SET status = 'Running', updated_at = CURRENT_TIMESTAMP WHERE id = ?
+            ''', (job['submission_id'],))
+        conn.commit()
+        return job
+    except Exception:
+        conn.rollback()
+        raise
+
+def finish_job(job_id, status, error=None):
+    conn = get_db_connection()
+    conn.execute('''
+        UPDATE solver_jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?
+    ''', (status, error, job_id))
+    conn.commit()
+
+def requeue_running_jobs():
+    """Put jobs that were Running when the process died back in the queue."""
+    conn = get_db_connection()
+    conn.execute('''
+        UPDATE vrp_problems SET status = 'Queued'
+        WHERE id IN (SELECT submission_id FROM solver_jobs WHERE status = 'Running')
+    ''')
+    conn.execute("UPDATE solver_jobs SET status = 'Queued', started_at = NULL WHERE status = 'Running'")
+    conn.commit()
+
+def fetch_latest_job(submission_id):
+    conn = get_db_connection()
+    job = conn.execute(
+        'SELECT * FROM solver_jobs WHERE submission_id = ? ORDER BY id DESC LIMIT 1', (submission_id,)
+    ).fetchone()
+    return job
 
 # Delete a submission
 def delete_submission(submission_id):
     conn = get_db_connection()
+    conn.execute('DELETE FROM solver_jobs WHERE submission_id = ?', (submission_id,))
+    conn.execute('DELETE FROM submission_outputs WHERE submission_id = ?', (submission_id,))
     conn.execute('DELETE FROM vrp_problems WHERE id = ?', (submission_id,))
     conn.commit()
-    conn.close()
@@ -0,0 +1,332 @@
+import codecs
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+from array import array
+import numpy as np
+from distance_cache import locations_hash
+
+DEFAULT_DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datasets')
+MAX_DATASET_LOCATIONS = 50000
+READ_CHUNK_SIZE = 64 * 1024
+
+LATITUDE_COLUMNS = ('latitude', 'lat')
+LONGITUDE_COLUMNS = ('longitude', 'lon', 'lng')
+# Optional per-location attributes; names are matched ignoring case and underscores
+DEMAND_COLUMNS = ('demand',)
+SERVICE_TIME_COLUMNS = ('servicetime', 'service')
+TIME_WINDOW_COLUMNS = ('timewindow',)
+TIME_WINDOW_START_COLUMNS = ('timewindowstart', 'readytime')
+TIME_WINDOW_END_COLUMNS = ('timewindowend', 'duetime')
+
+class DatasetError(ValueError):
+    """Raised when an uploaded locations file can't be parsed or fails validation."""
+
+class Coordinates:
+    """A locations dataset held column-wise as float64 arrays.
+
+    demands, service_times (seconds) and time_windows (an (N, 2) array of
+    earliest and latest arrival in seconds, inf for no deadline) are either all
+    None or all set, depending on whether the dataset has any of them.
+    """
+
+    def __init__(self, latitudes, longitudes, demands=None, service_times=None, time_windows=None):
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.demands = demands
+        self.service_times = service_times
+        self.time_windows = time_windows
+
+    def __len__(self):
+        return self.latitudes.shape[0]
+
+    @property
+    def has_attributes(self):
+        return self.demands is not None
+
+    def columns(self):
+        """The dataset as one (2, N) array, or (6, N) with demand, service time and time window rows."""
+        rows = [self.latitudes, self.longitudes]
+        if self.has_attributes:
+            rows += [self.demands, self.service_times, self.time_windows[:, 0], self.time_windows[:, 1]]
+        return np.vstack(rows)
+
+    def content_hash(self):
+        """Hash of the dataset contents; the plain locations hash when there are no attributes."""
+        if not self.has_attributes:
+            return locations_hash(self.latitudes, self.longitudes)
+        return hashlib.sha256(np.ascontiguousarray(self.columns()).tobytes()).hexdigest()
+
+    def subset(self, indices):
+        """A new dataset of the given locations, in that order, with their attributes."""
+        indices = np.asarray(indices, dtype=np.intp)
+        if not self.has_attributes:
+            return Coordinates(self.latitudes[indices], self.longitudes[indices])
+        return Coordinates(self.latitudes[indices], self.longitudes[indices], self.demands[indices],
+                           self.service_times[indices], self.time_windows[indices])
+
+    def take(self, indices):
+        """[latitude, longitude] pairs for the given location indices, as plain Python floats."""
+        indices = np.asarray(indices, dtype=np.intp)
+        return np.column_stack((self.latitudes[indices], self.longitudes[indices])).tolist()
+
+def with_attributes(latitudes, longitudes, demands, service_times, window_starts, window_ends):
+    """Coordinates with attribute columns, or plain Coordinates if every attribute is missing (NaN).
+
+    Missing values default to no demand, no service time and an open window.
+    """
+    if np.isnan(demands).all() and np.isnan(service_times).all() \
+            and np.isnan(window_starts).all() and np.isnan(window_ends).all():
+        return Coordinates(latitudes, longitudes)
+    time_windows = np.column_stack((np.nan_to_num(window_starts, nan=0.0),
+                                    np.nan_to_num(window_ends, nan=np.inf)))
+    return Coordinates(latitudes, longitudes, np.nan_to_num(demands, nan=0.0),
+                       np.nan_to_num(service_times, nan=0.0), time_windows)
+
+def read_locations_file(path):
+    """Parse a bundled-style JSON file ({"Locations": [{"Latitude", "Longitude"}, ...]}).
+
+    Locations may also have "Demand", "ServiceTime" and "TimeWindow" ([earliest, latest]).
+    """
+    with open(path, 'r') as file:
+        locations = json.load(file).get('Locations', [])
+    count = len(locations)
+    latitudes = np.fromiter((location['Latitude'] for location in locations), dtype=np.float64, count=count)
+    longitudes = np.fromiter((location['Longitude'] for location in locations), dtype=np.float64, count=count)
+    if not any(len(location) > 2 for location in locations):
+        return Coordinates(latitudes, longitudes)
+    attributes = np.array([parse_attributes(number, location_attributes(location))
+                           for number, location in enumerate(locations, start=1)], dtype=np.float64)
+    return with_attributes(latitudes, longitudes, *attributes.T)
+
+def load_coordinates(path):
+    """Load a dataset from either a stored .npy file (memory-mapped) or a JSON file."""
+    if path.endswith('.npy'):
+        columns = np.load(path, mmap_mode='r')
+        if columns.shape[0] > 2:
+            return Coordinates(columns[0], columns[1], columns[2], columns[3], columns[4:6].T)
+        return Coordinates(columns[0], columns[1])
+    return read_locations_file(path)
+
+def _normalize(name):
+    return name.strip().lower().replace('_', '').replace(' ', '')
+
+def _field(record, names):
+    for key, value in record.items():
+        if _normalize(key) in names:
+            return value
+    raise DatasetError(f"Location is missing a {names[0]} field: {record!r}")
+
+def _optional_field(record, names):
+    for key, value in record.items():
+        if _normalize(key) in names:
+            return value
+    return None
+
+def location_attributes(record):
+    """(demand, service time, window start, window end) of a JSON location, None where missing."""
+    time_window = _optional_field(record, TIME_WINDOW_COLUMNS)
+    if time_window is not None:
+        if not isinstance(time_window, list) or len(time_window) != 2:
+            raise DatasetError(f"TimeWindow must be [earliest, latest]: {record!r}")
+        window_start, window_end = time_window
+    else:
+        window_start = _optional_field(record, TIME_WINDOW_START_COLUMNS)
+        window_end = _optional_field(record, TIME_WINDOW_END_COLUMNS)
+    return (_optional_field(record, DEMAND_COLUMNS), _optional_field(record, SERVICE_TIME_COLUMNS),
+            window_start, window_end)
+
+def iter_json_locations(text_stream):
+    """Yield (latitude, longitude, demand, service time, window start, window end)
+    from a JSON upload without loading the whole document; missing attributes are None.
+
+    Accepts {"Locations": [...]} like the bundled files, or a bare array. Each
+    array element is decoded on its own as the text arrives.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+
+    def read_more():
+        nonlocal buffer, eof
+        chunk = text_stream.read(READ_CHUNK_SIZE)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+    # Find the opening bracket of the locations array
+    start = None
+    while start is None:
+        stripped = buffer.lstrip()
+        if stripped.startswith('['):
+            start = len(buffer) - len(stripped) + 1
+            break
+        match = re.search(r'"Locations"\s*:\s*\[', buffer)
+        if match:
+            start = match.end()
+            break
+        if eof:
+            raise DatasetError('No "Locations" array found in the JSON file.')
+        read_more()
+
+    buffer = buffer[start:]
+    position = 0
+    while True:
+        # Skip separators between elements
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            buffer = ''
+            position = 0
+            read_more()
+        if position >= len(buffer):
+            raise DatasetError('Unexpected end of JSON file.')
+        if buffer[position] == ']':
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise DatasetError('Invalid JSON in locations file.')
+            # Most likely the element is cut off at the chunk boundary
+            buffer = buffer[position:]
+            position = 0
+            read_more()
+            continue
+        if not isinstance(record, dict):
+            raise DatasetError('Each location must be an object with Latitude and Longitude.')
+        yield (_field(record, LATITUDE_COLUMNS), _field(record, LONGITUDE_COLUMNS)) + location_attributes(record)
+        position = end
+        # Drop consumed text so the buffer stays around one chunk in size
+        if position > READ_CHUNK_SIZE:
+            buffer = buffer[position:]
+            position = 0
+
+def iter_csv_locations(text_stream):
+    """Yield the same tuples as iter_json_locations from a CSV upload with a header row.
+
+    Besides the coordinates the header may name demand, service_time,
+    time_window_start and time_window_end columns.
+    """
+    reader = csv.reader(text_stream)
+    try:
+        header = [_normalize(name) for name in next(reader)]
+    except StopIteration:
+        raise DatasetError('The CSV file is empty.')
+    try:
+        latitude_column = next(i for i, name in enumerate(header) if name in LATITUDE_COLUMNS)
+        longitude_column = next(i for i, name in enumerate(header) if name in LONGITUDE_COLUMNS)
+    except StopIteration:
+        raise DatasetError('The CSV header needs Latitude and Longitude columns.')
+    attribute_columns = [
+        next((i for i, name in enumerate(header) if name in names), None)
+        for names in (DEMAND_COLUMNS, SERVICE_TIME_COLUMNS, TIME_WINDOW_START_COLUMNS, TIME_WINDOW_END_COLUMNS)
+    ]
+    for row in reader:
+        if not row:
+            continue
+        try:
+            yield (row[latitude_column], row[longitude_column]) + tuple(
+                row[column] if column is not None and row[column].strip() else None
+                for column in attribute_columns
+            )
+        except IndexError:
+            raise DatasetError(f'CSV line {reader.line_num} has too few columns.')
+
+def parse_upload(stream, filename):
+    """Parse and validate an uploaded JSON or CSV locations file.
+
+    Returns a Coordinates object. Points are collected into compact double
+    arrays while parsing, never as a list of dicts.
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    # Not io.TextIOWrapper: before Python 3.11 it can't wrap the SpooledTemporaryFile werkzeug hands over
+    text_stream = codecs.getreader('utf-8-sig')(stream)
+    if extension == '.csv':
+        rows = iter_csv_locations(text_stream)
+    elif extension == '.json':
+        rows = iter_json_locations(text_stream)
+    else:
+        raise DatasetError('Upload a .json or .csv file.')
+
+    latitudes = array('d')
+    longitudes = array('d')
+    # Attribute columns, NaN where a location doesn't give one
+    attributes = [array('d') for _ in range(4)]
+    for number, (latitude, longitude, *values) in enumerate(rows, start=1):
+        try:
+            latitude = float(latitude)
+            longitude = float(longitude)
+        except (TypeError, ValueError):
+            raise DatasetError(f'Location {number} has a non-numeric coordinate.')
+        if not (math.isfinite(latitude) and -90 <= latitude <= 90):
+            raise DatasetError(f'Location {number} has an invalid latitude: {latitude}')
+        if not (math.isfinite(longitude) and -180 <= longitude <= 180):
+            raise DatasetError(f'Location {number} has an invalid longitude: {longitude}')
+        if number > MAX_DATASET_LOCATIONS:
+            raise DatasetError(f'Datasets are limited to {MAX_DATASET_LOCATIONS} locations.')
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+        for column, value in zip(attributes, parse_attributes(number, values)):
+            column.append(value)
+
+    if len(latitudes) < 2:
+        raise DatasetError('A dataset needs at least two locations.')
+    return with_attributes(np.frombuffer(latitudes, dtype=np.float64), np.frombuffer(longitudes, dtype=np.float64),
+                           *(np.frombuffer(column, dtype=np.float64) for column in attributes))
+
+def parse_attributes(number, values):
+    """Validated demand, service time and time window of location `number`; NaN where missing."""
+    parsed = []
+    for name, value in zip(('demand', 'service time', 'time window start', 'time window end'), values):
+        if value is None:
+            parsed.append(math.nan)
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise DatasetError(f'Location {number} has a non-numeric {name}.')
+        if not (math.isfinite(value) and value >= 0):
+            raise DatasetError(f'Location {number} has an invalid {name}: {value}')
+        if name == 'demand' and not value.is_integer():
+            raise DatasetError(f'Location {number} has a fractional demand: {value}')
+        parsed.append(value)
+    window_start, window_end = parsed[2:]
+    if window_start > window_end:
+        raise DatasetError(f'Location {number} has a time window that ends before it starts.')
+    return parsed
+
+class DatasetStore:
+    """Content-addressed store of datasets as (2, N) float64 .npy files, or
+    (6, N) for datasets with demands, service times and time windows.
+
+    Files are named by Coordinates.content_hash, which for plain coordinates is
+    the same hash the distance matrix cache uses, so identical uploads share
+    one file and one cached matrix.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get('VRP_DATASETS_DIR', DEFAULT_DATASETS_DIR)
+
+    def path(self, content_hash):
+        return os.path.join(self.directory, f'{content_hash}.npy')
+
+    def save(self, coordinates):
+        """Store the coordinates unless an identical dataset exists; returns the content hash."""
+        content_hash = coordinates.content_hash()
+        path = self.path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as file:
+                np.save(file, coordinates.columns())
+            os.replace(tmp_path, path)
+        return content_hash
+
+dataset_store = DatasetStore()
@@ -0,0 +1,202 @@
+import math
+import os
+import time
+from concurrent.futures import as_completed
+import numpy as np
+import vrpSolver
+from datasets import load_coordinates
+
+# Submissions with at least this many locations are decomposed
+DECOMPOSE_MIN_LOCATIONS = int(os.environ.get('VRP_DECOMPOSE_MIN_LOCATIONS', 5000))
+# Target number of stops per cluster
+CLUSTER_SIZE = int(os.environ.get('VRP_DECOMPOSE_CLUSTER_SIZE', 500))
+
+def sweep_clusters(latitudes, longitudes, depot, num_clusters, weights=None):
+    """Split the non-depot locations into num_clusters sectors of similar size around the depot.
+
+    Locations are ordered by bearing from the depot, starting after the widest
+    empty angle so that no dense group is cut in two at an arbitrary point.
+    With weights (e.g. demands), sectors get similar total weight instead of
+    similar counts. Returns a list of index arrays.
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    nodes = np.delete(np.arange(latitudes.shape[0]), depot)
+    dlat = latitudes[nodes] - latitudes[depot]
+    dlon = (longitudes[nodes] - longitudes[depot]) * math.cos(math.radians(latitudes[depot]))
+    angles = np.arctan2(dlat, dlon)
+    order = np.argsort(angles, kind='stable')
+    sorted_angles = angles[order]
+    gaps = np.diff(np.append(sorted_angles, sorted_angles[0] + 2 * math.pi))
+    order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+    cumulative = np.cumsum(np.asarray(weights, dtype=np.float64)[nodes[order]]) if weights is not None else None
+    if cumulative is not None and cumulative[-1] > 0:
+        bounds = np.searchsorted(cumulative, cumulative[-1] * np.arange(1, num_clusters) / num_clusters)
+        return [nodes[chunk] for chunk in np.split(order, bounds)]
+    return [nodes[chunk] for chunk in np.array_split(order, num_clusters)]
+
+def allocate_vehicles(cluster_sizes, num_vehicles, minimums=None):
+    """Share the vehicles out in proportion to cluster size (largest remainder).
+
+    Every cluster gets at least its entry in minimums, or one vehicle; if the
+    minimums add up to more than num_vehicles, only the one.
+    """
+    if minimums is None or sum(minimums) > num_vehicles:
+        minimums = [1] * len(cluster_sizes)
+    total = sum(cluster_sizes)
+    spare = num_vehicles - sum(minimums)
+    shares = [spare * size / total if total else 0 for size in cluster_sizes]
+    vehicles = [minimum + int(share) for minimum, share in zip(minimums, shares)]
+    by_remainder = sorted(range(len(shares)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+    for i in by_remainder[:num_vehicles - sum(vehicles)]:
+        vehicles[i] += 1
+    return vehicles
+
+def plan(coordinates, num_vehicles, depot, cluster_size=CLUSTER_SIZE, vehicle_capacity=None):
+    """Clusters and their vehicle counts; a single cluster means there is nothing to decompose.
+
+    With a vehicle_capacity and demands, the sectors get similar total demand
+    and the vehicles are shared out by demand, with at least enough in each
+    cluster to carry its load.
+    """
+    num_clusters = min(num_vehicles, max(1, math.ceil((len(coordinates) - 1) / cluster_size)))
+    demands = coordinates.demands if vehicle_capacity is not None else None
+    clusters = sweep_clusters(coordinates.latitudes, coordinates.longitudes, depot, num_clusters, demands)
+    clusters = [cluster for cluster in clusters if len(cluster)]
+    if demands is None:
+        return clusters, allocate_vehicles([len(cluster) for cluster in clusters], num_vehicles)
+    loads = [int(np.sum(demands[cluster])) for cluster in clusters]
+    minimums = [max(1, math.ceil(load / vehicle_capacity)) for load in loads]
+    return clusters, allocate_vehicles(loads, num_vehicles, minimums)
+
+def solve_cluster(coordinates, num_vehicles, max_distance, search_options, vehicle_capacity=None, vehicle_speed=None,
+                  stop_event=None):
+    """Solve one cluster's locations with the depot at index 0. Runs in a worker process.
+
+    Setting stop_event ends the search once it has a solution, as in vrpSolver.run.
+
+    Returns (result, stats) like vrpSolver.run, with node indices local to the cluster.
+    """
+    stats = {}
+    peak_rss_reset = vrpSolver.reset_peak_rss()
+    # Clusters are small enough for the dense model, so the sparse mode option does not apply
+    search_options = {key: value for key, value in (search_options or {}).items() if key != 'candidate_neighbors'}
+    start = time.perf_counter()
+    data = vrpSolver.create_data_model(coordinates, num_vehicles, 0, use_cache=False,
+                                      vehicle_capacity=vehicle_capacity, vehicle_speed=vehicle_speed)
+    stats['matrix_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    manager, routing = vrpSolver.build_model(data, max_distance)
+    search_parameters = vrpSolver.build_search_parameters(**search_options)
+    stop_limit = vrpSolver.add_stop_limit(routing, stop_event) if stop_event is not None else None
+    stats['model_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    solution, _ = vrpSolver.search(routing, search_parameters)
+    stats['search_seconds'] = time.perf_counter() - start
+    if stop_limit is not None:
+        stats['stopped_early'] = stop_limit.stopped
+    stats.update(vrpSolver.search_statistics(routing))
+
+    start = time.perf_counter()
+    result = vrpSolver.extract_solution(data, manager, routing, solution) if solution else None
+    stats['extract_seconds'] = time.perf_counter() - start
+    stats.update(vrpSolver.peak_rss_stats(peak_rss_reset))
+    return result, stats
+
+def stitch(cluster_results, clusters, depot):
+    """Merge per-cluster results into one result with global node and vehicle numbers."""
+    routes = []
+    for result, cluster in zip(cluster_results, clusters):
+        # Local index 0 is the depot, local index i > 0 is cluster[i - 1]
+        nodes = np.concatenate(([depot], cluster))
+        for route_info in result['Routes']:
+            # Load and arrival times, when present, carry over unchanged
+            routes.append(dict(route_info, Vehicle=len(routes), Route=nodes[route_info['Route']].tolist()))
+    max_route_distance = max(route['Distance'] for route in routes)
+    # Same objective as the single model: arc costs plus the global span cost
+    objective = sum(route['Distance'] for route in routes) + 100 * max_route_distance
+    return {'Objective': objective, 'Routes': routes, 'MaxRouteDistance': max_route_distance}
+
+def merge_stats(cluster_stats):
+    """Totals of the per-cluster counters; search_seconds is the search time summed over clusters."""
+    merged = {}
+    for key in ('matrix_seconds', 'model_seconds', 'search_seconds', 'extract_seconds',
+                'solutions', 'branches', 'failures', 'accepted_neighbors'):
+        merged[key] = sum(stats[key] for stats in cluster_stats)
+    merged['wall_time_ms'] = max(stats['wall_time_ms'] for stats in cluster_stats)
+    merged['peak_rss_kb'] = max(stats['peak_rss_kb'] for stats in cluster_stats)
+    merged['peak_rss_scope'] = ('run' if all(stats['peak_rss_scope'] == 'run' for stats in cluster_stats)
+                                else 'process')
+    if any('stopped_early' in stats for stats in cluster_stats):
+        merged['stopped_early'] = any(stats.get('stopped_early') for stats in cluster_stats)
+    statuses = sorted({stats['search_status'] for stats in cluster_stats})
+    merged['search_status'] = ', '.join(statuses)
+    return merged
+
+def run_decomposed(input_file, num_vehicles, depot, max_distance, search_options, submit,
+                   vehicle_capacity=None, vehicle_speed=None, precheck=None, stop_event=None, on_progress=None):
+    """Cluster-first, route-second solve for large instances.
+
+    The stops are swept into sectors around the depot, each sector is solved as
+    its own VRP with a share of the vehicles, and the routes are stitched back
+    into one result. Each sub-problem only needs a cluster-sized distance
+    matrix. submit(function, *args) must return a Future, e.g. ProcessPoolExecutor.submit.
+    Capacities and time windows are enforced within each cluster. Like
+    vrpSolver.run, a problem the precheck proves infeasible is rejected before
+    anything is solved; precheck is the diagnosis if the caller already has it.
+    Setting stop_event (a multiprocessing Event) makes every cluster keep its
+    first solution, or its best so far if it is already searching.
+    on_progress({'clusters_solved', 'clusters', 'seconds'}) is called as each
+    cluster finishes.
+    Returns (result, stats) like vrpSolver.run; result is None if any cluster
+    has no solution.
+    """
+    start = time.perf_counter()
+    coordinates = load_coordinates(input_file)
+    load_seconds = time.perf_counter() - start
+
+    if precheck is None:
+        # Imported here: precheck builds on candidate_graph, which builds on this module
+        from precheck import feasibility_precheck
+        precheck = feasibility_precheck(coordinates, num_vehicles, depot, max_distance, vehicle_capacity,
+                                        vehicle_speed, use_cache=False)
+    if not precheck['feasible']:
+        stats = vrpSolver.rejected_stats()
+        stats.update(load_seconds=load_seconds, matrix_seconds=0.0, precheck=precheck,
+                     **vrpSolver.peak_rss_stats(False))
+        return None, stats
+
+    start = time.perf_counter()
+    clusters, vehicles = plan(coordinates, num_vehicles, depot, vehicle_capacity=vehicle_capacity)
+    decomposition_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    futures = []
+    for cluster, cluster_vehicles in zip(clusters, vehicles):
+        nodes = np.concatenate(([depot], cluster))
+        futures.append(submit(
+            solve_cluster, coordinates.subset(nodes), cluster_vehicles, max_distance, search_options,
+            vehicle_capacity, vehicle_speed, stop_event
+        ))
+    if on_progress is not None:
+        for solved, _ in enumerate(as_completed(futures), 1):
+            on_progress({'clusters_solved': solved, 'clusters': len(futures),
+                         'seconds': time.perf_counter() - start})
+    outcomes = [future.result() for future in futures]
+    parallel_seconds = time.perf_counter() - start
+
+    cluster_results = [result for result, _ in outcomes]
+    stats = merge_stats([cluster_stats for _, cluster_stats in outcomes])
+    stats.update({
+        'load_seconds': load_seconds,
+        'decomposition_seconds': decomposition_seconds,
+        'parallel_seconds': parallel_seconds,
+        'clusters': len(clusters),
+        'warm_start': False,
+        'precheck': precheck,
+    })
+    if any(result is None for result in cluster_results):
+        return None, stats
+    return stitch(cluster_results, clusters, depot), stats
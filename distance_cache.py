@@ -0,0 +1,121 @@
+import hashlib
+import os
+import threading
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'distance_matrices')
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+BUILD_CHUNK_ROWS = 1024
+
+def locations_hash(latitudes, longitudes):
+    """Content hash of a locations array, independent of the file it came from."""
+    coordinates = np.column_stack((
+        np.asarray(latitudes, dtype=np.float64),
+        np.asarray(longitudes, dtype=np.float64),
+    ))
+    return hashlib.sha256(np.ascontiguousarray(coordinates).tobytes()).hexdigest()
+
+class DistanceMatrixCache:
+    """On-disk cache of distance matrices stored as .npy files.
+
+    Matrices are opened read-only with mmap_mode so a hit costs a file open and
+    no copy. The directory is kept under max_bytes by evicting the least
+    recently used files (the modification time is bumped on every hit).
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.environ.get('VRP_CACHE_DIR', DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('VRP_DISTANCE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.npy')
+
+    def get_or_compute(self, latitudes, longitudes, compute):
+        """Return the cached matrix for these coordinates, building it on a miss.
+
+        compute(out) must fill the preallocated int32 array `out` in place.
+        """
+        key = locations_hash(latitudes, longitudes)
+        path = self._path(key)
+        try:
+            matrix = np.load(path, mmap_mode='r')
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return matrix
+        except (FileNotFoundError, ValueError):
+            pass
+
+        with self._lock:
+            self.misses += 1
+        os.makedirs(self.cache_dir, exist_ok=True)
+        num_locations = len(latitudes)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.int32,
+                                        shape=(num_locations, num_locations))
+        try:
+            compute(out)
+            out.flush()
+            del out
+            # Atomic rename so concurrent readers never see a half-written file
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict(keep=path)
+        return np.load(path, mmap_mode='r')
+
+    def evict(self, keep=None):
+        """Delete least recently used matrices until the cache fits in max_bytes."""
+        try:
+            entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                       if name.endswith('.npy')]
+        except FileNotFoundError:
+            return
+        files = []
+        for path in entries:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current size on disk."""
+        entries = 0
+        size = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.npy'):
+                    continue
+                try:
+                    size += os.path.getsize(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries += 1
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+        }
+
+distance_matrix_cache = DistanceMatrixCache()
@@ -0,0 +1,71 @@
+import threading
+import traceback
+from database import claim_next_job, finish_job, requeue_running_jobs, update_submission_results
+
+class JobQueue:
+    """Runs queued submissions in the background.
+
+    The queue itself is the solver_jobs table, so nothing is lost on restart:
+    jobs still marked Running from a previous process are put back in the
+    queue when the dispatcher starts. Each dispatcher thread claims one job at
+    a time and hands the submission id to `handler`, which does the solve and
+    stores the results. `handler` also gets the job's force_resolve flag, set
+    when the user asked to skip the solution cache.
+    """
+
+    def __init__(self, handler, workers=1, poll_interval=1.0):
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            requeue_running_jobs()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._loop, name=f'vrp-job-dispatcher-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        """Wake the dispatchers up after a job has been enqueued."""
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                job = claim_next_job()
+            except Exception:
+                traceback.print_exc()
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        try:
+            self.handler(job['submission_id'], force_resolve=bool(job['force_resolve']))
+        except Exception as e:
+            traceback.print_exc()
+            error_message = str(e) or type(e).__name__
+            update_submission_results(
+                submission_id=job['submission_id'],
+                success=0,
+                result=error_message,
+                status='Executed',
+                cache_hit=0
+            )
+            finish_job(job['id'], 'Failed', error=error_message)
+        else:
+            finish_job(job['id'], 'Done')
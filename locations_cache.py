@@ -0,0 +1,34 @@
+import os
+import threading
+from datasets import load_coordinates
+
+class LocationsCache:
+    """Process-wide cache of parsed location files.
+
+    Entries are keyed by path and invalidated when the file's mtime or size
+    changes, so edits to a dataset are picked up on the next request. Both the
+    bundled JSON files and stored .npy datasets go through here.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        coordinates = load_coordinates(path)
+        with self._lock:
+            self._entries[path] = (version, coordinates)
+        return coordinates
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+locations_cache = LocationsCache()
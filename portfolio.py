@@ -0,0 +1,164 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+import vrpSolver
+from datasets import load_coordinates
+from precheck import feasibility_precheck
+from solver_pool import follow_progress
+
+# Search configurations tried side by side, in order: (first solution strategy, metaheuristic, seed).
+# The submission's own options always come first.
+PORTFOLIO_CONFIGURATIONS = [
+    ('PATH_CHEAPEST_ARC', 'GUIDED_LOCAL_SEARCH', 1),
+    ('SAVINGS', 'GUIDED_LOCAL_SEARCH', 2),
+    ('PARALLEL_CHEAPEST_INSERTION', 'SIMULATED_ANNEALING', 3),
+    ('CHRISTOFIDES', 'TABU_SEARCH', 4),
+    ('LOCAL_CHEAPEST_INSERTION', 'GUIDED_LOCAL_SEARCH', 5),
+    ('PATH_CHEAPEST_ARC', 'SIMULATED_ANNEALING', 6),
+    ('GLOBAL_CHEAPEST_ARC', 'TABU_SEARCH', 7),
+]
+MAX_PORTFOLIO_SIZE = len(PORTFOLIO_CONFIGURATIONS) + 1
+
+def portfolio_options(search_options, size):
+    """Search options for each member of a portfolio of `size` searches.
+
+    Every member gets the same time and solution limits. Without a time limit
+    the metaheuristics would never stop, so the portfolio falls back to
+    DEFAULT_METAHEURISTIC_TIME_LIMIT as its budget.
+    """
+    base = dict(search_options or {})
+    if not base.get('time_limit') and not base.get('solution_limit'):
+        base['time_limit'] = vrpSolver.DEFAULT_METAHEURISTIC_TIME_LIMIT
+    members = [base]
+    for first_solution_strategy, local_search_metaheuristic, seed in PORTFOLIO_CONFIGURATIONS[:size - 1]:
+        members.append(dict(
+            base,
+            first_solution_strategy=first_solution_strategy,
+            local_search_metaheuristic=local_search_metaheuristic,
+            random_seed=seed,
+        ))
+    return members
+
+def run_portfolio(input_file, num_vehicles, depot, max_distance, search_options, size, submit, stop_event, workers,
+                  initial_routes=None, vehicle_capacity=None, vehicle_speed=None, precheck=None, progress=None,
+                  on_progress=None):
+    """Run up to `size` differently configured searches in parallel and keep the best solution.
+
+    The distance matrix is built once up front into the on-disk cache, so every
+    worker memory-maps the same read-only file instead of computing its own.
+    submit(function, *args) must return a Future, e.g. SolverPool.submit_task,
+    and workers is the number of processes behind it. The portfolio is capped
+    at workers: a member beyond that would only start once another one had
+    finished, and come back with next to nothing. stats record the requested
+    size when it was capped. Members can still wait behind other jobs on a
+    shared pool.
+
+    Every member gets the same limits, so they normally finish at about the
+    same time. Once the first one has finished, stop_event (a multiprocessing
+    Event, e.g. from SolverPool.progress_channel) is set. The others then stop
+    as soon as they have a solution and keep their best one, which ends
+    members that started late. Only the first member, which uses the
+    submission's own options, is warm-started from initial_routes; the rest
+    start cold to keep the portfolio diverse. The precheck runs once here,
+    unless the caller passes the diagnosis it already has, and the members
+    are handed its result instead of running it again.
+
+    With a progress queue from the same channel as stop_event, every member
+    puts its improving solutions on it and on_progress(event) is called with
+    the ones that improve on the best of the whole portfolio so far. Setting
+    stop_event before any member has finished stops them all early; stats
+    then have stopped_early, as with vrpSolver.run.
+
+    Returns (result, stats) like vrpSolver.run, with the winner's stats plus a
+    summary of every member. search_seconds is summed over the members.
+    """
+    members = portfolio_options(search_options, min(size, max(1, workers)))
+    start = time.perf_counter()
+    sparse = bool((search_options or {}).get('candidate_neighbors'))
+    locations = load_coordinates(input_file)
+    if not sparse:
+        vrpSolver.cached_distance_matrix(locations)
+    shared_matrix_seconds = time.perf_counter() - start
+
+    # One precheck for the whole portfolio; a rejected problem never reaches the members
+    if precheck is None:
+        precheck = feasibility_precheck(locations, num_vehicles, depot, max_distance, vehicle_capacity,
+                                        vehicle_speed, use_cache=not sparse)
+    if not precheck['feasible']:
+        stats = vrpSolver.rejected_stats()
+        stats.update(load_seconds=0.0, matrix_seconds=shared_matrix_seconds, precheck=precheck,
+                     **vrpSolver.peak_rss_stats(False))
+        return None, stats
+
+    if on_progress is None:
+        progress = None
+    start = time.perf_counter()
+    futures = [
+        submit(vrpSolver.run, input_file, num_vehicles, depot, max_distance, options,
+               initial_routes if i == 0 else None, stop_event, vehicle_capacity, vehicle_speed, progress, precheck)
+        for i, options in enumerate(members)
+    ]
+    relay = None
+    if progress is not None:
+        best_objective = None
+        def relay(event):
+            nonlocal best_objective
+            if best_objective is None or event['objective'] < best_objective:
+                best_objective = event['objective']
+                on_progress(event)
+    # The first member to finish stops the rest; if the event is set already, the caller stopped them all
+    if relay is None:
+        wait(futures, return_when=FIRST_COMPLETED)
+    else:
+        follow_progress(futures, progress, relay, until=any)
+    stopped_early = stop_event.is_set()
+    stop_event.set()
+    if relay is not None:
+        follow_progress(futures, progress, relay)
+    wait(futures)
+    parallel_seconds = time.perf_counter() - start
+
+    summary = []
+    best = None
+    for i, (options, future) in enumerate(zip(members, futures)):
+        entry = {
+            'first_solution_strategy': options.get('first_solution_strategy'),
+            'local_search_metaheuristic': options.get('local_search_metaheuristic'),
+            'random_seed': options.get('random_seed'),
+        }
+        if future.exception() is not None:
+            entry['error'] = str(future.exception()) or type(future.exception()).__name__
+        else:
+            result, stats = future.result()
+            entry.update({
+                'objective': result['Objective'] if result else None,
+                'search_status': stats['search_status'],
+                'search_seconds': stats['search_seconds'],
+            })
+            if result and (best is None or result['Objective'] < best[1]['Objective']):
+                best = (i, result, stats)
+        summary.append(entry)
+
+    failures = [entry for entry in summary if 'error' in entry]
+    if len(failures) == len(summary):
+        raise RuntimeError(f"All portfolio searches failed: {failures[0]['error']}")
+
+    if best is None:
+        # No search found a solution; report the first one that ran
+        first_run = next(future for future in futures if future.exception() is None)
+        result = None
+        stats = dict(first_run.result()[1])
+        stats['portfolio_winner'] = None
+    else:
+        winner, result, stats = best
+        stats = dict(stats)
+        stats['portfolio_winner'] = winner
+    stats.update({
+        'search_seconds': sum(entry.get('search_seconds', 0) for entry in summary),
+        'shared_matrix_seconds': shared_matrix_seconds,
+        'parallel_seconds': parallel_seconds,
+        'portfolio': summary,
+        'stopped_early': stopped_early,
+    })
+    if len(members) < size:
+        stats['portfolio_requested'] = size
+    return result, stats
@@ -0,0 +1,140 @@
+import math
+import time
+import numpy as np
+import vrpSolver
+from candidate_graph import haversine_pair_distances
+
+# The nearest-neighbour vehicle bound needs the full distance matrix; above this
+# many locations it is only computed when a matrix is already at hand
+NEAREST_NEIGHBOR_BOUND_MAX_LOCATIONS = 2000
+MATRIX_CHUNK_ROWS = 1024
+
+def depot_distances(locations, depot, distance_matrix=None):
+    """Distances in integer metres from the depot to every location (the depot row of the matrix)."""
+    if distance_matrix is not None:
+        return np.asarray(distance_matrix[depot], dtype=np.int64)
+    latitudes, longitudes = vrpSolver.coordinate_columns(locations)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    return haversine_pair_distances(latitudes[depot], longitudes[depot], latitudes, longitudes).astype(np.int64)
+
+def nearest_neighbor_distances(distance_matrix):
+    """Distance from every location to its nearest other location, a block of rows at a time."""
+    num_locations = len(distance_matrix)
+    nearest = np.empty(num_locations, dtype=np.int64)
+    for start in range(0, num_locations, MATRIX_CHUNK_ROWS):
+        stop = min(start + MATRIX_CHUNK_ROWS, num_locations)
+        block = np.array(distance_matrix[start:stop], dtype=np.int64)
+        block[np.arange(stop - start), np.arange(start, stop)] = np.iinfo(np.int64).max
+        nearest[start:stop] = block.min(axis=1)
+    return nearest
+
+def describe(indices, message):
+    """message(index) for the first offending location, plus how many more there are."""
+    text = message(int(indices[0]))
+    if len(indices) > 1:
+        text += f" ({len(indices) - 1} more location{'s' if len(indices) > 2 else ''} too)"
+    return text + "."
+
+def feasibility_precheck(locations, num_vehicles, depot, max_distance, vehicle_capacity=None, vehicle_speed=None,
+                         distance_matrix=None, use_cache=True):
+    """Fast necessary conditions for a solution, checked before any model is built.
+
+    Every route starts and ends at the depot, so a location farther than half
+    of max_distance from it can never be visited. The vehicle count is bounded
+    below by the total demand over the capacity, and by the route lengths:
+    every location is left along at least its shortest arc, and every route
+    also leaves the depot along at least the depot's shortest arc, all within
+    max_distance per vehicle. With time
+    windows, each location must be reachable straight from the depot before
+    its window closes, with time to get back before the depot closes.
+
+    Only the depot row of distance_matrix is needed for the distance checks;
+    the full matrix adds the length bound. Without one, the length bound uses
+    the on-disk matrix cache for datasets of up to
+    NEAREST_NEIGHBOR_BOUND_MAX_LOCATIONS, unless use_cache is False.
+
+    Returns a dict: feasible is False when the problem provably has no
+    solution, with the reasons; min_vehicles and vehicle_bounds are the
+    lower bounds on the fleet size.
+    """
+    start = time.perf_counter()
+    num_locations = len(locations)
+    reasons = []
+    diagnosis = {
+        'feasible': True,
+        'reasons': reasons,
+        'min_vehicles': 1,
+        'vehicle_bounds': {'capacity': None, 'distance': None},
+        'farthest_location': None,
+        'farthest_round_trip': None,
+    }
+    if not 0 <= depot < num_locations:
+        reasons.append(f"The depot {depot} is not a location index (there are {num_locations} locations).")
+        diagnosis.update(feasible=False, seconds=time.perf_counter() - start)
+        return diagnosis
+
+    stops = np.ones(num_locations, dtype=bool)
+    stops[depot] = False
+
+    # Round trips from the depot, from its row of the matrix
+    depot_row = depot_distances(locations, depot, distance_matrix)
+    round_trips = 2 * depot_row
+    round_trips[depot] = 0
+    farthest = int(np.argmax(round_trips))
+    diagnosis['farthest_location'] = farthest
+    diagnosis['farthest_round_trip'] = int(round_trips[farthest])
+    too_far = np.flatnonzero(round_trips > max_distance)
+    if len(too_far):
+        too_far = too_far[np.argsort(-round_trips[too_far], kind='stable')]
+        reasons.append(describe(too_far, lambda i: (
+            f"Location {i} is {int(round_trips[i])} m from the depot and back, "
+            f"more than the maximum distance of {max_distance} m"
+        )))
+
+    bounds = diagnosis['vehicle_bounds']
+    demands = getattr(locations, 'demands', None)
+    if vehicle_capacity is not None and demands is not None:
+        demands = np.asarray(demands, dtype=np.int64)
+        too_heavy = np.flatnonzero(stops & (demands > vehicle_capacity))
+        if len(too_heavy):
+            reasons.append(describe(too_heavy, lambda i: (
+                f"Location {i} has a demand of {int(demands[i])}, more than the vehicle capacity of {vehicle_capacity}"
+            )))
+        bounds['capacity'] = math.ceil(int(demands[stops].sum()) / vehicle_capacity)
+
+    if distance_matrix is None and use_cache and num_locations <= NEAREST_NEIGHBOR_BOUND_MAX_LOCATIONS:
+        distance_matrix = vrpSolver.cached_distance_matrix(locations)
+    if distance_matrix is not None and num_locations > 1:
+        # K routes cover sum(nearest) + K * shortest depot arc <= K * max_distance
+        nearest_total = int(nearest_neighbor_distances(distance_matrix)[stops].sum())
+        budget = max_distance - int(depot_row[stops].min())
+        if budget > 0:
+            bounds['distance'] = max(1, math.ceil(nearest_total / budget))
+
+    time_windows = getattr(locations, 'time_windows', None)
+    if time_windows is not None:
+        metres_per_second = (vehicle_speed or vrpSolver.DEFAULT_VEHICLE_SPEED_KMH) / 3.6
+        service_times = np.ceil(np.asarray(locations.service_times, dtype=np.float64))
+        travel = np.ceil(depot_row / metres_per_second)
+        depot_open, depot_close = time_windows[depot]
+        # Same travel times as vrpSolver.travel_time_matrix: service at the origin plus driving
+        arrivals = depot_open + service_times[depot] + travel
+        late = np.flatnonzero(stops & (arrivals > time_windows[:, 1]))
+        if len(late):
+            reasons.append(describe(late, lambda i: (
+                f"Location {i} can't be reached before its time window closes at {int(time_windows[i, 1])} s"
+            )))
+        returns = np.maximum(arrivals, time_windows[:, 0]) + service_times + travel
+        stranded = np.flatnonzero(stops & (returns > depot_close))
+        if len(stranded):
+            reasons.append(describe(stranded, lambda i: (
+                f"A vehicle serving location {i} can't get back before the depot closes at {int(depot_close)} s"
+            )))
+
+    diagnosis['min_vehicles'] = max([1] + [bound for bound in bounds.values() if bound is not None])
+    if diagnosis['min_vehicles'] > num_vehicles:
+        reasons.append(f"At least {diagnosis['min_vehicles']} vehicles are needed, but the fleet has {num_vehicles}.")
+    diagnosis['feasible'] = not reasons
+    diagnosis['seconds'] = time.perf_counter() - start
+    return diagnosis
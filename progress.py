@@ -0,0 +1,63 @@
+import threading
+import time
+
+class ProgressBoard:
+    """Live progress of the solves running in this process.
+
+    Each running submission has the improving solutions its search has found
+    so far, in order, and the event that stops its search early. Job threads
+    publish to it and the progress streams wait on it; a submission's entry
+    only lives while its job runs, the results are in the database after that.
+    """
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def open(self, submission_id, stop_event):
+        with self._lock:
+            # Each run has its own condition, so a publish only wakes the streams of that submission
+            self._runs[submission_id] = {'events': [], 'stop_event': stop_event,
+                                         'changed': threading.Condition(self._lock)}
+
+    def publish(self, submission_id, event):
+        with self._lock:
+            run = self._runs.get(submission_id)
+            if run is not None:
+                run['events'].append(event)
+                run['changed'].notify_all()
+
+    def close(self, submission_id):
+        with self._lock:
+            run = self._runs.pop(submission_id, None)
+            if run is not None:
+                run['changed'].notify_all()
+
+    def request_stop(self, submission_id):
+        """Ask a running search to stop and keep its best solution. False if it isn't running here."""
+        with self._lock:
+            run = self._runs.get(submission_id)
+        if run is None:
+            return False
+        run['stop_event'].set()
+        return True
+
+    def wait(self, submission_id, seen, timeout):
+        """Events after the first `seen`, waiting up to timeout seconds for one.
+
+        Returns None once the submission isn't running in this process, and an
+        empty list if the timeout passed without a new event.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            run = self._runs.get(submission_id)
+            while run is not None and len(run['events']) <= seen:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                run['changed'].wait(remaining)
+                if self._runs.get(submission_id) is not run:
+                    return None
+            return None if run is None else run['events'][seen:]
+
+progress_board = ProgressBoard()
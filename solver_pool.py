@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# How long a waiting solve blocks on its progress queue before checking whether it has finished
+PROGRESS_POLL_SECONDS = 0.5
+
+def default_worker_count():
+    """Number of solver processes: VRP_SOLVER_WORKERS, or one per CPU core."""
+    configured = os.environ.get('VRP_SOLVER_WORKERS')
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+def _init_worker():
+    # Pay the ortools/numpy import once per worker instead of once per solve
+    import vrpSolver  # noqa: F401
+
+def _run_solver(input_file, num_vehicles, depot, max_distance, search_options, initial_routes,
+                vehicle_capacity, vehicle_speed, progress=None, stop_event=None, precheck=None):
+    import vrpSolver
+    return vrpSolver.run(input_file, num_vehicles, depot, max_distance, search_options, initial_routes,
+                         stop_event, vehicle_capacity=vehicle_capacity, vehicle_speed=vehicle_speed,
+                         progress=progress, precheck=precheck)
+
+def follow_progress(futures, progress, on_progress, timeout=None, until=all):
+    """Hand the events on the progress queue to on_progress until all of the futures are done.
+
+    With until=any it returns as soon as one of them is done.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while deadline is None or time.monotonic() < deadline:
+        try:
+            event = progress.get(timeout=PROGRESS_POLL_SECONDS)
+        except queue.Empty:
+            # The worker puts every event before its solve returns, so an empty queue is the end
+            if until(future.done() for future in futures):
+                return
+            continue
+        on_progress(event)
+
+class SolverPool:
+    """Persistent pool of solver processes fed through the executor's call queue."""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or default_worker_count()
+        self._executor = None
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn rather than fork: the web process is multi-threaded
+                context = multiprocessing.get_context('spawn')
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def progress_channel(self):
+        """A (queue, event) pair the workers can use: a solve reports its progress
+        on the queue and stops early once the event is set."""
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context('spawn').Manager()
+            return self._manager.Queue(), self._manager.Event()
+
+    def submit_task(self, function, *args):
+        """Run any picklable module-level function on the pool; returns its Future."""
+        return self._get_executor().submit(function, *args)
+
+    def submit(self, input_file, num_vehicles, depot, max_distance, search_options=None, initial_routes=None,
+               vehicle_capacity=None, vehicle_speed=None, progress=None, stop_event=None, precheck=None):
+        """Queue a solve and return a Future resolving to vrpSolver.run's (result, stats).
+
+        progress and stop_event come from progress_channel; precheck is a
+        diagnosis the caller already has (see vrpSolver.run).
+        """
+        return self.submit_task(
+            _run_solver, input_file, num_vehicles, depot, max_distance, search_options, initial_routes,
+            vehicle_capacity, vehicle_speed, progress, stop_event, precheck
+        )
+
+    def solve(self, input_file, num_vehicles, depot, max_distance, search_options=None, initial_routes=None,
+              timeout=None, vehicle_capacity=None, vehicle_speed=None, progress=None, stop_event=None,
+              on_progress=None, precheck=None):
+        """Run a solve on the pool and wait for (result, stats).
+
+        progress and stop_event come from progress_channel; on_progress is then
+        called in this thread with every improving solution as it arrives.
+        """
+        try:
+            future = self.submit(input_file, num_vehicles, depot, max_distance, search_options, initial_routes,
+                                 vehicle_capacity, vehicle_speed, progress, stop_event, precheck)
+            if progress is not None and on_progress is not None:
+                follow_progress([future], progress, on_progress, timeout)
+            return future.result(timeout=timeout)
+        except BrokenProcessPool:
+            # A worker died (e.g. crashed inside ortools); start a fresh pool next time
+            self.shutdown(wait=False)
+            raise
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+solver_pool = SolverPool()
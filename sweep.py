@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import vrpSolver
+from datasets import load_coordinates
+from precheck import feasibility_precheck
+
+# Per worker process: problem data by (input file, capacity, speed), with the
+# matrices already converted to lists, so a worker prepares a dataset only once
+_data_templates = {}
+
+def data_template(input_file, vehicle_capacity=None, vehicle_speed=None):
+    """Problem data for a dataset without the fleet size, built on first use in this process."""
+    key = (input_file, vehicle_capacity, vehicle_speed)
+    template = _data_templates.get(key)
+    if template is None:
+        locations = load_coordinates(input_file)
+        template = vrpSolver.create_data_model(locations, 0, 0, vehicle_capacity=vehicle_capacity,
+                                               vehicle_speed=vehicle_speed)
+        for name in ('distance_matrix', 'time_matrix'):
+            if name in template:
+                template[name] = vrpSolver.matrix_rows(template[name])
+        _data_templates[key] = template
+    return template
+
+def solve_point(input_file, num_vehicles, depot, max_distance, search_options, vehicle_capacity=None,
+                vehicle_speed=None):
+    """Solve one grid point. Runs in a worker process.
+
+    Returns (result, stats) like vrpSolver.run.
+    """
+    stats = {}
+    start = time.perf_counter()
+    data = dict(data_template(input_file, vehicle_capacity, vehicle_speed), num_vehicles=num_vehicles, depot=depot)
+    manager, routing = vrpSolver.build_model(data, max_distance)
+    search_parameters = vrpSolver.build_search_parameters(**(search_options or {}))
+    stats['model_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    solution, _ = vrpSolver.search(routing, search_parameters)
+    stats['search_seconds'] = time.perf_counter() - start
+    stats.update(vrpSolver.search_statistics(routing))
+    result = vrpSolver.extract_solution(data, manager, routing, solution) if solution else None
+    return result, stats
+
+def dominating_failure(failures, num_vehicles, max_distance):
+    """A proven infeasible (vehicles, cap) point that implies this one is infeasible too, or None.
+
+    Fewer vehicles or a tighter cap can only remove solutions, so a point with
+    no more vehicles and no larger cap than an infeasible one has no solution either.
+    """
+    return next(((vehicles, cap) for vehicles, cap in failures
+                 if num_vehicles <= vehicles and max_distance <= cap), None)
+
+def run_sweep(input_file, depot, vehicle_counts, max_distances, search_options, submit, max_in_flight,
+              vehicle_capacity=None, vehicle_speed=None):
+    """Solve every (num_vehicles, max_distance) point of a grid for one dataset.
+
+    The distance matrix is built once into the on-disk cache, and every worker
+    memory-maps it and keeps its converted form across the points it solves.
+    Points run max_in_flight at a time, largest fleet and largest cap first.
+    Each point first goes through the feasibility precheck on the cached
+    matrix. A point that is proven infeasible, by the precheck or by a search
+    ending in ROUTING_INFEASIBLE, marks every point with no more vehicles and no
+    larger cap as pruned, so those are never searched. A search that ends on
+    its limits without a solution proves nothing: its point is reported as
+    "no solution" and prunes nothing.
+    submit(function, *args) must return a Future, e.g. ProcessPoolExecutor.submit.
+
+    Returns (rows, stats): one row per point, ordered by fleet size then cap.
+    """
+    # A point without a solution never reaches a solution limit, so every point gets a time limit
+    search_options = dict(search_options or {})
+    if not search_options.get('time_limit'):
+        search_options['time_limit'] = vrpSolver.DEFAULT_METAHEURISTIC_TIME_LIMIT
+
+    start = time.perf_counter()
+    locations = load_coordinates(input_file)
+    distance_matrix = vrpSolver.cached_distance_matrix(locations)
+    stats = {'matrix_seconds': time.perf_counter() - start}
+
+    start = time.perf_counter()
+    queue = deque((num_vehicles, max_distance)
+                  for num_vehicles in sorted(set(vehicle_counts), reverse=True)
+                  for max_distance in sorted(set(max_distances), reverse=True))
+    rows = {}
+    failures = []
+    pending = {}
+    while queue or pending:
+        while queue and len(pending) < max_in_flight:
+            num_vehicles, max_distance = queue.popleft()
+            row = {'num_vehicles': num_vehicles, 'max_distance': max_distance}
+            failed_point = dominating_failure(failures, num_vehicles, max_distance)
+            if failed_point is not None:
+                row.update(status='pruned', pruned_by=list(failed_point))
+                rows[num_vehicles, max_distance] = row
+                continue
+            diagnosis = feasibility_precheck(locations, num_vehicles, depot, max_distance, vehicle_capacity,
+                                             vehicle_speed, distance_matrix)
+            if not diagnosis['feasible']:
+                row.update(status='infeasible', reasons=diagnosis['reasons'])
+                rows[num_vehicles, max_distance] = row
+                failures.append((num_vehicles, max_distance))
+                continue
+            future = submit(solve_point, input_file, num_vehicles, depot, max_distance, search_options,
+                            vehicle_capacity, vehicle_speed)
+            pending[future] = row
+        if not pending:
+            continue
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            row = pending.pop(future)
+            rows[row['num_vehicles'], row['max_distance']] = row
+            if future.exception() is not None:
+                row.update(status='failed', error=str(future.exception()) or type(future.exception()).__name__)
+                continue
+            result, point_stats = future.result()
+            row.update(search_seconds=point_stats['search_seconds'], search_status=point_stats['search_status'])
+            if point_stats['search_status'] == 'ROUTING_INFEASIBLE':
+                row['status'] = 'infeasible'
+                failures.append((row['num_vehicles'], row['max_distance']))
+            elif result is None:
+                row['status'] = 'no solution'
+            else:
+                row.update(status='solved', objective=result['Objective'],
+                           max_route_distance=result['MaxRouteDistance'])
+
+    ordered = [rows[key] for key in sorted(rows)]
+    stats.update({
+        'parallel_seconds': time.perf_counter() - start,
+        'points': len(ordered),
+        'searched': sum(1 for row in ordered if row['status'] != 'pruned' and 'reasons' not in row),
+        'infeasible': sum(1 for row in ordered if row['status'] == 'infeasible'),
+        'pruned': sum(1 for row in ordered if row['status'] == 'pruned'),
+        'search_seconds': sum(row.get('search_seconds', 0) for row in ordered),
+    })
+    return ordered, stats
+
+def format_table(rows):
+    """The sweep results as a plain-text comparison table."""
+    lines = [f"{'Vehicles':>8} {'Max distance':>12} {'Objective':>12} {'Max route':>10}  Status"]
+    for row in rows:
+        objective = row.get('objective', '-')
+        max_route_distance = row.get('max_route_distance', '-')
+        status = row['status']
+        if status == 'pruned':
+            status = f"pruned (infeasible at {row['pruned_by'][0]} vehicles, {row['pruned_by'][1]}m)"
+        elif row.get('reasons'):
+            status = f"infeasible ({row['reasons'][0]})"
+        lines.append(f"{row['num_vehicles']:>8} {row['max_distance']:>12} {objective:>12} {max_route_distance:>10}  {status}")
+    return "\n".join(lines)
+
+def parse_values(text):
+    """Integers from a list such as "1-5,8,10" (ranges are inclusive)."""
+    values = []
+    for part in text.split(','):
+        low, _, high = part.partition('-')
+        values.extend(range(int(low), int(high) + 1) if high else [int(low)])
+    return values
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a grid of fleet sizes and distance caps for one dataset.")
+    parser.add_argument('input_file', help="JSON file with a Locations array, or a stored .npy dataset")
+    parser.add_argument('depot', type=int)
+    parser.add_argument('--vehicles', type=parse_values, required=True, help='Fleet sizes, e.g. "1-50"')
+    parser.add_argument('--max-distances', type=parse_values, required=True,
+                        help='Distance caps in metres, e.g. "50000,100000,200000"')
+    parser.add_argument('--first-solution-strategy', choices=vrpSolver.FIRST_SOLUTION_STRATEGIES)
+    parser.add_argument('--local-search-metaheuristic', choices=vrpSolver.LOCAL_SEARCH_METAHEURISTICS)
+    parser.add_argument('--time-limit', type=float,
+                        help=f"Search time limit per point, in seconds (default {vrpSolver.DEFAULT_METAHEURISTIC_TIME_LIMIT})")
+    parser.add_argument('--solution-limit', type=int, help="Stop each point after this many solutions")
+    parser.add_argument('--vehicle-capacity', type=int)
+    parser.add_argument('--vehicle-speed', type=float)
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--json', action='store_true', help="Print the rows as JSON")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    search_options = {
+        'first_solution_strategy': args.first_solution_strategy,
+        'local_search_metaheuristic': args.local_search_metaheuristic,
+        'time_limit': args.time_limit,
+        'solution_limit': args.solution_limit,
+    }
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        rows, stats = run_sweep(os.path.abspath(args.input_file), args.depot, args.vehicles, args.max_distances,
+                                search_options, executor.submit, workers, args.vehicle_capacity, args.vehicle_speed)
+    print(f"Sweep statistics: {stats}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(rows, separators=(',', ':')))
+    else:
+        print(format_table(rows))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# The app reads its database and dataset paths at import, so point them at scratch copies first
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix='vrp-tests-')
+shutil.copy(os.path.join(ROOT, 'db', 'saastest.db'), os.path.join(SCRATCH, 'saastest.db'))
+os.environ['VRP_DB_PATH'] = os.path.join(SCRATCH, 'saastest.db')
+os.environ['VRP_DATASETS_DIR'] = os.path.join(SCRATCH, 'datasets')
+os.environ['VRP_CACHE_DIR'] = os.path.join(SCRATCH, 'cache')
+sys.path.insert(0, ROOT)
+
+import pytest
+import website
+
+@pytest.fixture(scope='session', autouse=True)
+def scratch_directory():
+    yield
+    website.job_queue.stop()
+    website.solver_pool.shutdown()
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+@pytest.fixture
+def client():
+    website.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    client = website.app.test_client()
+    client.post('/login', data={'username': 'user1', 'password': '1234'})
+    return client
@@ -0,0 +1,23 @@
+import numpy as np
+
+from candidate_graph import nearest_neighbors, project
+
+def test_nearest_neighbors_match_brute_force():
+    rng = np.random.default_rng(7)
+    latitudes = 38.0 + rng.random(300) * 0.2
+    longitudes = 23.7 + rng.random(300) * 0.2
+    # A tight group far from the rest makes the search widen its block of cells
+    latitudes[:5] = 38.5 + rng.random(5) * 0.001
+
+    neighbors = nearest_neighbors(latitudes, longitudes, 8)
+
+    x, y = project(latitudes, longitudes)
+    squared = (x[:, None] - x) ** 2 + (y[:, None] - y) ** 2
+    np.fill_diagonal(squared, np.inf)
+    expected = np.argsort(squared, axis=1, kind='stable')[:, :8]
+    assert neighbors.shape == (300, 8)
+    assert (neighbors == expected).all()
+
+def test_nearest_neighbors_caps_k_at_the_other_locations():
+    neighbors = nearest_neighbors(np.array([38.0, 38.01, 38.02]), np.array([23.7, 23.7, 23.7]), 5)
+    assert neighbors.tolist() == [[1, 2], [0, 2], [1, 0]]
@@ -0,0 +1,12 @@
+import pytest
+import website
+
+@pytest.mark.parametrize('username, password', [('user1', '1234'), ('admin', 'admin')])
+def test_dashboards_include_the_shared_script(username, password):
+    website.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    client = website.app.test_client()
+    client.post('/login', data={'username': username, 'password': password})
+    response = client.get('/dashboard')
+    assert response.status_code == 200
+    assert response.data.count(b'Poll queued/running submissions') == 1
+    assert response.data.count(b'Load the next page of submissions') == 1
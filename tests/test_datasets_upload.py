@@ -0,0 +1,34 @@
+import io
+import os
+
+import pytest
+import website
+
+CSV_UPLOAD = (
+    b'\xef\xbb\xbfLatitude,Longitude,Demand,ServiceTime,TimeWindowStart,TimeWindowEnd\r\n'
+    b'37.9838,23.7275,0,0,0,43200\r\n'
+    b'37.9755,23.7348,3,300,3600,14400\r\n'
+    b'37.9908,23.7033,5,300,,\r\n'
+)
+JSON_UPLOAD = (
+    b'{"Locations": [{"Latitude": 37.9838, "Longitude": 23.7275},'
+    b' {"Latitude": 37.9755, "Longitude": 23.7348}]}'
+)
+
+@pytest.mark.parametrize('filename, content, num_locations', [
+    ('stops.csv', CSV_UPLOAD, 3),
+    ('stops.json', JSON_UPLOAD, 2),
+])
+def test_upload_dataset(client, filename, content, num_locations):
+    response = client.post('/datasets', data={'file': (io.BytesIO(content), filename)},
+                           content_type='multipart/form-data', follow_redirects=True)
+    assert f'Dataset uploaded: {num_locations} locations.'.encode() in response.data
+
+    dataset = next(dataset for dataset in website.fetch_datasets_by_user(2) if dataset['name'] == filename)
+    assert dataset['num_locations'] == num_locations
+    assert os.path.isfile(website.dataset_store.path(dataset['content_hash']))
+
+def test_upload_rejects_invalid_dataset(client):
+    response = client.post('/datasets', data={'file': (io.BytesIO(b'Latitude,Longitude\n95,23.7\n37.9,23.7\n'), 'bad.csv')},
+                           content_type='multipart/form-data', follow_redirects=True)
+    assert b'Invalid dataset: Location 1 has an invalid latitude' in response.data
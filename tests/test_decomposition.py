@@ -0,0 +1,44 @@
+import numpy as np
+
+from datasets import Coordinates
+from decomposition import allocate_vehicles, plan, stitch
+
+def test_allocate_vehicles_in_proportion_to_size():
+    assert allocate_vehicles([300, 100], 6) == [4, 2]
+    assert sum(allocate_vehicles([5, 7, 11], 10)) == 10
+
+def test_allocate_vehicles_honours_minimums():
+    assert allocate_vehicles([10, 90], 6, minimums=[3, 1]) == [3, 3]
+    # Minimums that can't all be met fall back to one vehicle each
+    assert allocate_vehicles([10, 90], 3, minimums=[2, 2]) == [1, 2]
+
+def test_plan_shares_vehicles_by_demand():
+    # Depot in the middle, 20 light stops to the east and 20 heavy ones to the west
+    angles = np.concatenate((np.linspace(-1, 1, 20), np.linspace(np.pi - 1, np.pi + 1, 20)))
+    latitudes = np.concatenate(([38.0], 38.0 + 0.01 * np.sin(angles)))
+    longitudes = np.concatenate(([23.7], 23.7 + 0.01 * np.cos(angles)))
+    demands = np.concatenate(([0], np.full(20, 1), np.full(20, 9)))
+    coordinates = Coordinates(latitudes, longitudes, demands, np.zeros(41), np.tile([0, np.inf], (41, 1)))
+
+    clusters, vehicles = plan(coordinates, 10, 0, cluster_size=20, vehicle_capacity=25)
+    loads = [int(demands[cluster].sum()) for cluster in clusters]
+    assert sum(vehicles) == 10
+    assert all(count * 25 >= load for count, load in zip(vehicles, loads))
+
+    # Without a capacity only the counts matter
+    _, vehicles = plan(coordinates, 10, 0, cluster_size=20)
+    assert vehicles == [5, 5]
+
+def test_stitch_maps_clusters_back_to_global_nodes():
+    clusters = [np.array([4, 2]), np.array([1, 3])]
+    cluster_results = [
+        {'Routes': [{'Vehicle': 0, 'Route': [0, 2, 1, 0], 'Distance': 300}]},
+        {'Routes': [{'Vehicle': 0, 'Route': [0, 1, 0], 'Distance': 100},
+                    {'Vehicle': 1, 'Route': [0, 2, 0], 'Distance': 200, 'Load': 7}]},
+    ]
+    result = stitch(cluster_results, clusters, 0)
+    assert [route['Route'] for route in result['Routes']] == [[0, 2, 4, 0], [0, 1, 0], [0, 3, 0]]
+    assert [route['Vehicle'] for route in result['Routes']] == [0, 1, 2]
+    assert result['Routes'][2]['Load'] == 7
+    assert result['MaxRouteDistance'] == 300
+    assert result['Objective'] == 600 + 100 * 300
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+import website
+
+SOLVABLE = {'num_vehicles': 4, 'depot': 0, 'max_distance': 30000, 'locations': '1', 'name': 'rerun',
+            'time_limit': 1, 'warm_start': 'on'}
+
+@pytest.fixture
+def solved_submission(client):
+    response = client.post('/select_model')
+    submission_id = int(response.headers['Location'].rsplit('/', 1)[1])
+    client.post(f'/view_submission/{submission_id}', data=SOLVABLE)
+    website.execute_submission(submission_id, force_resolve=True)
+    submission = website.fetch_submission_by_id(submission_id)
+    assert submission['objective_value'] is not None
+    assert website.fetch_submission_output(submission_id, 'routes') is not None
+    return submission_id
+
+def assert_no_solution_left(client, submission_id):
+    submission = website.fetch_submission_by_id(submission_id)
+    assert submission['status'] == 'Executed'
+    assert website.fetch_submission_output(submission_id, 'result') == 'No solution found !'
+    assert submission['objective_value'] is None
+    assert submission['max_route_distance'] is None
+    assert website.fetch_submission_output(submission_id, 'routes') is None
+    response = client.get(f'/view_results/{submission_id}')
+    assert response.status_code == 200
+    assert b'No routes available.' in response.data
+
+def test_rerun_rejected_by_precheck_clears_previous_solution(client, solved_submission):
+    client.post(f'/view_submission/{solved_submission}', data=dict(SOLVABLE, max_distance=1000))
+    website.execute_submission(solved_submission)
+
+    assert_no_solution_left(client, solved_submission)
+    stats = json.loads(website.fetch_submission_by_id(solved_submission)['stats'])
+    assert stats['search_status'] == 'PRECHECK_INFEASIBLE'
+    assert not stats['precheck']['feasible']
+
+def test_rerun_without_solution_clears_previous_solution(client, solved_submission, monkeypatch):
+    stats = dict(website.rejected_stats(), search_status='ROUTING_INFEASIBLE', load_seconds=0.0, matrix_seconds=0.0)
+    monkeypatch.setattr(website.solver_pool, 'solve', lambda *args, **kwargs: (None, stats))
+    website.execute_submission(solved_submission, force_resolve=True)
+
+    assert_no_solution_left(client, solved_submission)
+
+def test_rerun_warm_starts_from_previous_routes(client, solved_submission, monkeypatch):
+    calls = []
+    def solve(*args, **kwargs):
+        calls.append(args)
+        return None, dict(website.rejected_stats(), load_seconds=0.0, matrix_seconds=0.0)
+    monkeypatch.setattr(website.solver_pool, 'solve', solve)
+    previous_routes = json.loads(website.fetch_submission_output(solved_submission, 'routes'))
+    website.execute_submission(solved_submission, force_resolve=True)
+
+    # initial_routes is solve's sixth positional argument
+    assert calls[0][5] == previous_routes
+
+def test_decomposed_rerun_records_options_it_ignored(client, solved_submission, monkeypatch):
+    monkeypatch.setattr(website, 'DECOMPOSE_MIN_LOCATIONS', 10)
+    client.post(f'/view_submission/{solved_submission}', data=dict(SOLVABLE, portfolio_size=3))
+    website.execute_submission(solved_submission, force_resolve=True)
+
+    stats = json.loads(website.fetch_submission_by_id(solved_submission)['stats'])
+    assert stats['clusters'] == 1
+    assert stats['portfolio_requested'] == 3
+    assert stats['warm_start_requested']
+    response = client.get(f'/view_results/{solved_submission}')
+    assert b'3 parallel searches were requested' in response.data
+    assert b'A warm start was requested' in response.data
+
+def test_identical_rerun_is_served_from_the_cache(client, solved_submission):
+    solved = website.fetch_submission_by_id(solved_submission)
+    website.execute_submission(solved_submission)
+
+    submission = website.fetch_submission_by_id(solved_submission)
+    assert submission['cache_hit'] == 1
+    assert submission['cache_source_id'] == solved_submission
+    assert submission['credits'] == 0
+    assert submission['objective_value'] == solved['objective_value']
@@ -0,0 +1,42 @@
+import os
+import threading
+from concurrent.futures import Future
+
+import vrpSolver
+from portfolio import portfolio_options, run_portfolio
+
+LOCATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jsons', 'locations_20.json')
+
+def test_portfolio_options():
+    members = portfolio_options({'first_solution_strategy': 'SAVINGS'}, 3)
+    assert len(members) == 3
+    assert members[0] == {'first_solution_strategy': 'SAVINGS', 'time_limit': vrpSolver.DEFAULT_METAHEURISTIC_TIME_LIMIT}
+    assert [member.get('random_seed') for member in members] == [None, 1, 2]
+    assert all(member['time_limit'] == vrpSolver.DEFAULT_METAHEURISTIC_TIME_LIMIT for member in members)
+    assert portfolio_options({'solution_limit': 10}, 1) == [{'solution_limit': 10}]
+
+def test_run_portfolio_keeps_the_best_member():
+    objectives = {None: 500, 1: 300, 2: None}
+    submitted = []
+    def submit(function, *args):
+        options, initial_routes = args[4], args[5]
+        submitted.append(initial_routes)
+        future = Future()
+        if options.get('random_seed') == 2:
+            future.set_exception(RuntimeError("member failed"))
+        else:
+            objective = objectives[options.get('random_seed')]
+            result = {'Objective': objective, 'Routes': [], 'MaxRouteDistance': 0}
+            future.set_result((result, {'search_status': 'ROUTING_SUCCESS', 'search_seconds': 2.0}))
+        return future
+
+    result, stats = run_portfolio(LOCATIONS, 4, 0, 10000000, {'time_limit': 1}, 4, submit, threading.Event(), 3,
+                                  initial_routes=[[1, 2]])
+    assert result['Objective'] == 300
+    assert stats['portfolio_winner'] == 1
+    # Capped at the three workers, and only the first member is warm-started
+    assert stats['portfolio_requested'] == 4
+    assert submitted == [[[1, 2]], None, None]
+    assert stats['portfolio'][2]['error'] == "member failed"
+    assert stats['search_seconds'] == 4.0
+    assert not stats['stopped_early']
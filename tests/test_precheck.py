@@ -0,0 +1,59 @@
+import numpy as np
+
+import vrpSolver
+from datasets import Coordinates
+from precheck import feasibility_precheck
+
+# A depot with three stops about 1.1 km north, 2.2 km north and 0.9 km east of it
+LATITUDES = np.array([38.0, 38.01, 38.02, 38.0])
+LONGITUDES = np.array([23.7, 23.7, 23.7, 23.71])
+
+def locations(demands=None, window_ends=None):
+    if demands is None and window_ends is None:
+        return Coordinates(LATITUDES, LONGITUDES)
+    demands = np.zeros(4) if demands is None else np.asarray(demands, dtype=np.float64)
+    window_ends = np.full(4, np.inf) if window_ends is None else np.asarray(window_ends, dtype=np.float64)
+    return Coordinates(LATITUDES, LONGITUDES, demands, np.zeros(4), np.column_stack((np.zeros(4), window_ends)))
+
+def test_feasible_problem():
+    diagnosis = feasibility_precheck(locations(), 2, 0, 10000, use_cache=False)
+    assert diagnosis['feasible']
+    assert diagnosis['reasons'] == []
+    assert diagnosis['farthest_location'] == 2
+    assert diagnosis['min_vehicles'] == 1
+
+def test_location_out_of_reach():
+    diagnosis = feasibility_precheck(locations(), 2, 0, 3000, use_cache=False)
+    assert not diagnosis['feasible']
+    assert diagnosis['reasons'] == ["Location 2 is 4448 m from the depot and back, more than the maximum distance of 3000 m."]
+
+def test_capacity_bounds_the_fleet():
+    diagnosis = feasibility_precheck(locations(demands=[0, 5, 5, 30]), 1, 0, 10000, vehicle_capacity=20,
+                                     use_cache=False)
+    assert not diagnosis['feasible']
+    assert diagnosis['vehicle_bounds']['capacity'] == 2
+    assert diagnosis['reasons'] == [
+        "Location 3 has a demand of 30, more than the vehicle capacity of 20.",
+        "At least 2 vehicles are needed, but the fleet has 1.",
+    ]
+
+def test_route_length_bounds_the_fleet():
+    # Ten stops evenly spread on a 1 km circle around the depot, about 620 m apart
+    angles = np.linspace(0, 2 * np.pi, 10, endpoint=False)
+    latitudes = np.concatenate(([38.0], 38.0 + np.sin(angles) / 111.2))
+    longitudes = np.concatenate(([23.7], 23.7 + np.cos(angles) / (111.2 * np.cos(np.radians(38.0)))))
+    distance_matrix = vrpSolver.haversine_distance_matrix(latitudes, longitudes)
+    diagnosis = feasibility_precheck(Coordinates(latitudes, longitudes), 4, 0, 2500, distance_matrix=distance_matrix)
+    # About 6.2 km of shortest arcs, and 1.5 km of every route left after its depot arc
+    assert diagnosis['vehicle_bounds']['distance'] == 5
+    assert diagnosis['reasons'] == ["At least 5 vehicles are needed, but the fleet has 4."]
+
+def test_time_window_out_of_reach():
+    diagnosis = feasibility_precheck(locations(window_ends=[86400, 86400, 10, 86400]), 2, 0, 10000, use_cache=False)
+    assert not diagnosis['feasible']
+    assert diagnosis['reasons'] == ["Location 2 can't be reached before its time window closes at 10 s."]
+
+def test_depot_out_of_range():
+    diagnosis = feasibility_precheck(locations(), 2, 7, 10000, use_cache=False)
+    assert not diagnosis['feasible']
+    assert diagnosis['reasons'] == ["The depot 7 is not a location index (there are 4 locations)."]
@@ -0,0 +1,34 @@
+import threading
+import time
+
+from progress import ProgressBoard
+
+def test_wait_ignores_other_submissions():
+    board = ProgressBoard()
+    board.open(1, threading.Event())
+    board.open(2, threading.Event())
+    def publish_elsewhere():
+        for objective in range(20):
+            board.publish(2, {'objective': objective, 'seconds': 0.0})
+            time.sleep(0.005)
+    publisher = threading.Thread(target=publish_elsewhere)
+    publisher.start()
+    start = time.monotonic()
+    assert board.wait(1, 0, 0.3) == []
+    assert time.monotonic() - start >= 0.3
+    publisher.join()
+
+def test_wait_returns_new_events_and_none_once_closed():
+    board = ProgressBoard()
+    stop_event = threading.Event()
+    board.open(1, stop_event)
+    board.publish(1, {'objective': 10, 'seconds': 0.1})
+    threading.Timer(0.05, board.publish, (1, {'objective': 9, 'seconds': 0.2})).start()
+    assert board.wait(1, 0, 5) == [{'objective': 10, 'seconds': 0.1}]
+    assert board.wait(1, 1, 5) == [{'objective': 9, 'seconds': 0.2}]
+
+    assert board.request_stop(1)
+    assert stop_event.is_set()
+    threading.Timer(0.05, board.close, (1,)).start()
+    assert board.wait(1, 2, 5) is None
+    assert not board.request_stop(1)
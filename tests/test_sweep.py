@@ -0,0 +1,44 @@
+import os
+from concurrent.futures import Future
+
+import sweep
+
+LOCATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jsons', 'locations_20.json')
+
+def test_dominating_failure():
+    failures = [(3, 20000), (5, 10000)]
+    assert sweep.dominating_failure(failures, 3, 20000) == (3, 20000)
+    assert sweep.dominating_failure(failures, 2, 15000) == (3, 20000)
+    assert sweep.dominating_failure(failures, 4, 10000) == (5, 10000)
+    assert sweep.dominating_failure(failures, 4, 15000) is None
+    assert sweep.dominating_failure(failures, 6, 5000) is None
+    assert sweep.dominating_failure([], 1, 1) is None
+
+def completed(function, *args):
+    future = Future()
+    future.set_result(function(*args))
+    return future
+
+def test_run_sweep_prunes_only_proven_infeasible_points(monkeypatch):
+    statuses = {
+        (4, 10000000): 'ROUTING_SUCCESS',
+        (4, 5000000): 'ROUTING_FAIL_TIMEOUT',
+        (3, 10000000): 'ROUTING_INFEASIBLE',
+    }
+    def solve_point(input_file, num_vehicles, depot, max_distance, *args):
+        status = statuses[num_vehicles, max_distance]
+        result = {'Objective': 1000, 'MaxRouteDistance': 500} if status == 'ROUTING_SUCCESS' else None
+        return result, {'search_status': status, 'search_seconds': 1.0}
+    monkeypatch.setattr(sweep, 'solve_point', solve_point)
+
+    rows, stats = sweep.run_sweep(LOCATIONS, 0, [2, 3, 4], [5000000, 10000000], {'time_limit': 1}, completed, 1)
+    by_point = {(row['num_vehicles'], row['max_distance']): row for row in rows}
+    assert by_point[4, 10000000]['status'] == 'solved'
+    # A search that hit its limits proves nothing, so (3, 5000000) isn't pruned by it
+    assert by_point[4, 5000000]['status'] == 'no solution'
+    assert by_point[3, 10000000]['status'] == 'infeasible'
+    for point in [(3, 5000000), (2, 10000000), (2, 5000000)]:
+        assert by_point[point]['status'] == 'pruned'
+        assert by_point[point]['pruned_by'] == [3, 10000000]
+    assert stats['searched'] == 3
+    assert stats['pruned'] == 3
@@ -1,10 +1,44 @@
+import argparse
 import json
 import os
+import resource
 import sys
+import time
+import numpy as np
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
+from distance_cache import distance_matrix_cache, BUILD_CHUNK_ROWS
+from datasets import load_coordinates
+import math
 from math import radians, sin, cos, sqrt, atan2
 
+# Search options that can be chosen per submission
+FIRST_SOLUTION_STRATEGIES = [
+    'PATH_CHEAPEST_ARC',
+    'SAVINGS',
+    'CHRISTOFIDES',
+    'PARALLEL_CHEAPEST_INSERTION',
+    'LOCAL_CHEAPEST_INSERTION',
+    'GLOBAL_CHEAPEST_ARC',
+    'PATH_MOST_CONSTRAINED_ARC',
+    'AUTOMATIC',
+]
+LOCAL_SEARCH_METAHEURISTICS = [
+    'AUTOMATIC',
+    'GREEDY_DESCENT',
+    'GUIDED_LOCAL_SEARCH',
+    'SIMULATED_ANNEALING',
+    'TABU_SEARCH',
+]
+DEFAULT_FIRST_SOLUTION_STRATEGY = 'PATH_CHEAPEST_ARC'
+DEFAULT_LOCAL_SEARCH_METAHEURISTIC = 'AUTOMATIC'
+# Metaheuristics that keep searching until a limit is hit get this many seconds if none is set
+DEFAULT_METAHEURISTIC_TIME_LIMIT = 30
+# Average speed that turns distances into travel times for datasets with time windows
+DEFAULT_VEHICLE_SPEED_KMH = 40
+# How often a running search checks whether it has been asked to stop
+STOP_POLL_SECONDS = 0.2
+
 def haversine_distance(lat1, lon1, lat2, lon2):
     """Calculate the great-circle distance between two points on the Earth's surface."""
     # Convert latitude and longitude from degrees to radians
@@ -18,46 +52,168 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     distance = 6371 * c  # Earth radius in kilometers
     return int(round(1000 * distance))
 
-def calculate_distance_matrix(locations):
-    """Calculate distance matrix based on Manhattan distance."""
-    num_locations = len(locations)
-    distance_matrix = [[0]*num_locations for _ in range(num_locations)]
+def haversine_distance_matrix(latitudes, longitudes, chunk_size=None, out=None):
+    """Calculate the full haversine distance matrix in integer metres.
+
+    Gives exactly the same values as calling haversine_distance for every pair,
+    but works on whole rows at once with NumPy. Only the upper triangle is
+    computed and mirrored into the lower one. With chunk_size set, rows are
+    processed in blocks of that size so the temporary float arrays stay at
+    chunk_size x N instead of N x N. A preallocated int32 array (for example an
+    np.memmap) can be passed as out to avoid holding the result in memory.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    num_locations = lat.shape[0]
+    cos_lat = np.cos(lat)
+
+    if out is None:
+        out = np.empty((num_locations, num_locations), dtype=np.int32)
+    if chunk_size is None:
+        chunk_size = max(num_locations, 1)
+
+    for start in range(0, num_locations, chunk_size):
+        stop = min(start + chunk_size, num_locations)
+        # Columns from `start` onwards cover the upper triangle of this block
+        dlat = lat[start:] - lat[start:stop, None]
+        dlon = lon[start:] - lon[start:stop, None]
+        a = (np.sin(dlat / 2) ** 2
+             + cos_lat[start:stop, None] * cos_lat[start:] * np.sin(dlon / 2) ** 2)
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        # Same operation order and round-half-to-even as int(round(1000 * distance))
+        block = np.rint(1000 * (6371 * c)).astype(np.int32)
+        out[start:stop, start:] = block
+        out[start:, start:stop] = block.T
+    return out
+
+def coordinate_columns(locations):
+    """Latitude and longitude columns of a Coordinates object or a list of location dicts."""
+    if hasattr(locations, 'latitudes'):
+        return locations.latitudes, locations.longitudes
+    latitudes = [location['Latitude'] for location in locations]
+    longitudes = [location['Longitude'] for location in locations]
+    return latitudes, longitudes
+
+def calculate_distance_matrix(locations, chunk_size=None, out=None):
+    """Calculate the haversine distance matrix as an int32 NumPy array."""
+    latitudes, longitudes = coordinate_columns(locations)
+    return haversine_distance_matrix(latitudes, longitudes, chunk_size=chunk_size, out=out)
+
+def cached_distance_matrix(locations, cache=distance_matrix_cache):
+    """Distance matrix for these locations, memory-mapped from the on-disk cache."""
+    latitudes, longitudes = coordinate_columns(locations)
+    return cache.get_or_compute(
+        latitudes, longitudes,
+        lambda out: haversine_distance_matrix(latitudes, longitudes, chunk_size=BUILD_CHUNK_ROWS, out=out)
+    )
+
+def travel_time_matrix(distance_matrix, vehicle_speed, service_times, chunk_size=BUILD_CHUNK_ROWS):
+    """Travel times in whole seconds at vehicle_speed (km/h), as an int32 array.
 
-    for i in range(num_locations):
-        for j in range(num_locations):
-            lat1, lon1 = locations[i]['Latitude'], locations[i]['Longitude']
-            lat2, lon2 = locations[j]['Latitude'], locations[j]['Longitude']
-            distance_matrix[i][j] = haversine_distance(lat1, lon1, lat2, lon2)
-    return distance_matrix
+    Each row also includes the service time at its origin, so a single transit
+    matrix covers both. Built from the distance matrix in blocks of rows.
+    """
+    metres_per_second = vehicle_speed / 3.6
+    service_times = np.asarray(service_times, dtype=np.float64)
+    num_locations = len(distance_matrix)
+    out = np.empty((num_locations, num_locations), dtype=np.int32)
+    for start in range(0, num_locations, chunk_size):
+        stop = min(start + chunk_size, num_locations)
+        block = np.ceil(distance_matrix[start:stop] / metres_per_second)
+        block += np.ceil(service_times[start:stop, None])
+        out[start:stop] = block
+    return out
 
-def create_data_model(locations, num_vehicles, depot):
+def constraint_data(locations, vehicle_capacity=None, vehicle_speed=None):
+    """Demand and time window data for the model, for whichever constraints apply.
+
+    Capacities apply when vehicle_capacity is given; locations without demands
+    then count as zero demand. Time windows apply when the dataset has them.
+    """
+    data = {}
+    if vehicle_capacity is not None:
+        demands = getattr(locations, 'demands', None)
+        data["vehicle_capacity"] = int(vehicle_capacity)
+        data["demands"] = (np.zeros(len(locations), dtype=np.int64) if demands is None
+                           else np.asarray(demands).astype(np.int64))
+    if getattr(locations, 'time_windows', None) is not None:
+        data["vehicle_speed"] = vehicle_speed or DEFAULT_VEHICLE_SPEED_KMH
+        data["service_times"] = np.ceil(np.asarray(locations.service_times)).astype(np.int64)
+        data["time_windows"] = np.asarray(locations.time_windows, dtype=np.float64)
+    return data
+
+def create_data_model(locations, num_vehicles, depot, use_cache=True, vehicle_capacity=None, vehicle_speed=None):
     """Stores the data for the problem."""
     data = {}
-    data["distance_matrix"] = calculate_distance_matrix(locations)
+    if use_cache:
+        data["distance_matrix"] = cached_distance_matrix(locations)
+    else:
+        data["distance_matrix"] = calculate_distance_matrix(locations)
     data["num_vehicles"] = num_vehicles
     data["depot"] = depot
+    data.update(constraint_data(locations, vehicle_capacity, vehicle_speed))
+    if "time_windows" in data:
+        data["time_matrix"] = travel_time_matrix(data["distance_matrix"], data["vehicle_speed"], data["service_times"])
     return data
 
-def print_solution(data, manager, routing, solution):
-    """Prints solution on console."""
-    print(f"Objective: {solution.ObjectiveValue()}")
+def extract_solution(data, manager, routing, solution):
+    """Returns the solution as a plain dict (objective, routes, max route distance)."""
+    routes = []
     max_route_distance = 0
     for vehicle_id in range(data["num_vehicles"]):
         index = routing.Start(vehicle_id)
-        plan_output = f"Route for vehicle {vehicle_id}:\n"
+        route = []
         route_distance = 0
         while not routing.IsEnd(index):
-            plan_output += f" {manager.IndexToNode(index)} -> "
+            route.append(manager.IndexToNode(index))
             previous_index = index
             index = solution.Value(routing.NextVar(index))
             route_distance += routing.GetArcCostForVehicle(
                 previous_index, index, vehicle_id
             )
-        plan_output += f"{manager.IndexToNode(index)}\n"
-        plan_output += f"Distance of the route: {route_distance}m\n"
-        print(plan_output)
+        route.append(manager.IndexToNode(index))
+        route_info = {"Vehicle": vehicle_id, "Route": route, "Distance": route_distance}
+        if "vehicle_capacity" in data:
+            route_info["Load"] = solution.Value(routing.GetDimensionOrDie("Capacity").CumulVar(index))
+        if "time_windows" in data:
+            route_info["Arrivals"] = route_arrivals(routing, solution, vehicle_id)
+        routes.append(route_info)
         max_route_distance = max(route_distance, max_route_distance)
-    print(f"Maximum of the route distances: {max_route_distance}m")
+    return {
+        "Objective": solution.ObjectiveValue(),
+        "Routes": routes,
+        "MaxRouteDistance": max_route_distance,
+    }
+
+def route_arrivals(routing, solution, vehicle_id):
+    """Earliest feasible arrival time in seconds at each stop of a vehicle's route."""
+    time_dimension = routing.GetDimensionOrDie("Time")
+    arrivals = []
+    index = routing.Start(vehicle_id)
+    while True:
+        arrivals.append(solution.Min(time_dimension.CumulVar(index)))
+        if routing.IsEnd(index):
+            return arrivals
+        index = solution.Value(routing.NextVar(index))
+
+def format_solution(result):
+    """Formats a solution dict as the human-readable solver report."""
+    lines = [f"Objective: {result['Objective']}"]
+    for route in result["Routes"]:
+        nodes = route["Route"]
+        lines.append(f"Route for vehicle {route['Vehicle']}:")
+        lines.append("".join(f" {node} -> " for node in nodes[:-1]) + f"{nodes[-1]}")
+        if "Arrivals" in route:
+            lines.append("Arrival times: " + ", ".join(f"{seconds}s" for seconds in route["Arrivals"]))
+        if "Load" in route:
+            lines.append(f"Load of the route: {route['Load']}")
+        lines.append(f"Distance of the route: {route['Distance']}m\n")
+    lines.append(f"Maximum of the route distances: {result['MaxRouteDistance']}m")
+    return "\n".join(lines)
+
+def print_solution(data, manager, routing, solution, file=None):
+    """Prints solution on console."""
+    print(format_solution(extract_solution(data, manager, routing, solution)), file=file)
     
 def read_json_file(file_path):
     """Read JSON file."""
@@ -65,23 +221,44 @@ def read_json_file(file_path):
         data = json.load(file)
         return data.get('Locations', [])  # Access the "Locations" array
 
-def main():
-    """Entry point of the program."""
-    if len(sys.argv) != 5:
-        print("Wrong number of args.\nUsage: python <script_name.py> <input_file.json> <num_vehicles> <depot> <max_distance>")
-        sys.exit(1)
+def build_search_parameters(first_solution_strategy=None, local_search_metaheuristic=None,
+                            time_limit=None, solution_limit=None):
+    """Routing search parameters from option names; None means the default.
 
-    input_file = os.path.abspath(sys.argv[1])  # Get absolute path
-    num_vehicles = int(sys.argv[2])
-    depot = int(sys.argv[3])
-    max_distance = int(sys.argv[4])
-    # Read JSON file
-    locations = read_json_file(input_file)
+    time_limit is in seconds. Guided local search, simulated annealing and tabu
+    search never stop on their own, so they get DEFAULT_METAHEURISTIC_TIME_LIMIT
+    when neither limit is given.
+    """
+    first_solution_strategy = first_solution_strategy or DEFAULT_FIRST_SOLUTION_STRATEGY
+    local_search_metaheuristic = local_search_metaheuristic or DEFAULT_LOCAL_SEARCH_METAHEURISTIC
+    if first_solution_strategy not in FIRST_SOLUTION_STRATEGIES:
+        raise ValueError(f"Unknown first solution strategy: {first_solution_strategy}")
+    if local_search_metaheuristic not in LOCAL_SEARCH_METAHEURISTICS:
+        raise ValueError(f"Unknown local search metaheuristic: {local_search_metaheuristic}")
 
-    # Instantiate the data problem.
-    data = create_data_model(locations, num_vehicles, depot)
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = getattr(
+        routing_enums_pb2.FirstSolutionStrategy, first_solution_strategy
+    )
+    search_parameters.local_search_metaheuristic = getattr(
+        routing_enums_pb2.LocalSearchMetaheuristic, local_search_metaheuristic
+    )
+    if (time_limit is None and solution_limit is None
+            and local_search_metaheuristic not in ('AUTOMATIC', 'GREEDY_DESCENT')):
+        time_limit = DEFAULT_METAHEURISTIC_TIME_LIMIT
+    if time_limit is not None:
+        search_parameters.time_limit.FromMilliseconds(int(time_limit * 1000))
+    if solution_limit is not None:
+        search_parameters.solution_limit = int(solution_limit)
+    return search_parameters
+
+def matrix_rows(matrix):
+    """A matrix as the list of rows RegisterTransitMatrix takes; lists (converted once and reused) pass through."""
+    return matrix if isinstance(matrix, list) else matrix.tolist()
 
-# Create the routing index manager.
+def build_model(data, max_distance):
+    """Builds the routing index manager and model for `data`."""
+    # Create the routing index manager.
     manager = pywrapcp.RoutingIndexManager(
         len(data["distance_matrix"]), data["num_vehicles"], data["depot"]
     )
@@ -89,16 +266,20 @@ def main():
     # Create Routing Model.
     routing = pywrapcp.RoutingModel(manager)
 
-    # Create and register a transit callback.
-    def distance_callback(from_index, to_index):
-        """Returns the distance between the two nodes."""
-        # Convert from routing variable Index to distance matrix NodeIndex.
-        from_node = manager.IndexToNode(from_index)
-        to_node = manager.IndexToNode(to_index)
-        return data["distance_matrix"][from_node][to_node]
+    # Register the distance matrix itself so arc costs are looked up natively,
+    # without calling back into Python during the search.
+    transit_callback_index = routing.RegisterTransitMatrix(matrix_rows(data["distance_matrix"]))
+    add_distance_costs(routing, transit_callback_index, max_distance)
 
-    transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    # Travel times and demands are native too: a transit matrix and a unary transit vector
+    time_callback_index = None
+    if "time_matrix" in data:
+        time_callback_index = routing.RegisterTransitMatrix(matrix_rows(data["time_matrix"]))
+    add_constraint_dimensions(manager, routing, data, max_distance, time_callback_index)
+    return manager, routing
 
+def add_distance_costs(routing, transit_callback_index, max_distance):
+    """Arc costs, the per-vehicle distance limit and the span cost, shared by the dense and sparse models."""
     # Define cost of each arc.
     routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
 
@@ -114,18 +295,361 @@ def main():
     distance_dimension = routing.GetDimensionOrDie(dimension_name)
     distance_dimension.SetGlobalSpanCostCoefficient(100)
 
-    # Setting first solution heuristic.
-    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-    search_parameters.first_solution_strategy = (
-        routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-    )
+def add_constraint_dimensions(manager, routing, data, max_distance, time_callback_index=None):
+    """Capacity and time window dimensions for the constraints present in `data`."""
+    if "vehicle_capacity" in data:
+        demand_callback_index = routing.RegisterUnaryTransitVector(data["demands"].tolist())
+        routing.AddDimension(
+            demand_callback_index,
+            0,  # no slack
+            data["vehicle_capacity"],  # vehicle capacity
+            True,  # start cumul to zero
+            "Capacity",
+        )
+
+    if time_callback_index is not None:
+        time_windows = data["time_windows"]
+        # No arrival can be later than the latest finite bound plus a full route's
+        # driving and every service time, which stands in for open deadlines
+        finite = time_windows[np.isfinite(time_windows)]
+        horizon = (int(finite.max(initial=0)) + int(data["service_times"].sum())
+                   + math.ceil(max_distance * 3.6 / data["vehicle_speed"]))
+        windows = np.minimum(time_windows, horizon).astype(np.int64).tolist()
+        routing.AddDimension(
+            time_callback_index,
+            horizon,  # allow waiting for a window to open
+            horizon,  # latest time of any cumul
+            False,  # vehicles may start after time zero
+            "Time",
+        )
+        time_dimension = routing.GetDimensionOrDie("Time")
+        depot = data["depot"]
+        for node, (earliest, latest) in enumerate(windows):
+            if node != depot:
+                time_dimension.CumulVar(manager.NodeToIndex(node)).SetRange(earliest, latest)
+        # Every vehicle leaves and returns within the depot's window
+        for vehicle_id in range(data["num_vehicles"]):
+            for index in (routing.Start(vehicle_id), routing.End(vehicle_id)):
+                time_dimension.CumulVar(index).SetRange(*windows[depot])
+                routing.AddVariableMinimizedByFinalizer(time_dimension.CumulVar(index))
+
+def initial_routes_from(routes, num_vehicles, depot, num_locations):
+    """Turns stored routes (extract_solution's "Routes") into OR-Tools initial routes.
+
+    Depot visits are dropped since every route starts and ends there anyway, and
+    a location is only kept the first time it appears, which covers a changed
+    depot. Stops of vehicles that no longer exist go to the last vehicle.
+    Returns None if the routes refer to locations outside the dataset.
+    """
+    initial_routes = [[] for _ in range(num_vehicles)]
+    seen = {depot}
+    for route_info in routes:
+        vehicle = min(route_info['Vehicle'], num_vehicles - 1)
+        for node in route_info['Route']:
+            if not 0 <= node < num_locations:
+                return None
+            if node not in seen:
+                seen.add(node)
+                initial_routes[vehicle].append(node)
+    return initial_routes
+
+def search(routing, search_parameters, initial_routes=None):
+    """Runs the search, starting from initial_routes if they give a valid assignment.
+
+    The initial assignment is rejected when the routes miss a location or break
+    a constraint such as the distance limit; the search then starts from the first solution strategy.
+    Returns (solution, warm_started).
+    """
+    if initial_routes:
+        routing.CloseModelWithParameters(search_parameters)
+        initial_assignment = routing.ReadAssignmentFromRoutes(initial_routes, True)
+        if initial_assignment is not None:
+            return routing.SolveFromAssignmentWithParameters(initial_assignment, search_parameters), True
+    return routing.SolveWithParameters(search_parameters), False
+
+class StopLimit:
+    """Search limit that is crossed once stop_event is set and the search has a
+    solution to keep, so the best solution so far is returned.
+
+    The event usually lives in another process, so it is checked at most
+    every poll_seconds. Register at_solution as a solution callback.
+
+    The website attaches one to every solve so that its Stop button works.
+    benchmarks/stop_limit.py measures what that costs: on locations_200 the
+    median search time was 2-3% longer, within the run-to-run spread.
+    """
+
+    def __init__(self, stop_event, poll_seconds=STOP_POLL_SECONDS):
+        self.stop_event = stop_event
+        self.poll_seconds = poll_seconds
+        self.has_solution = False
+        self.stopped = False
+        self._next_poll = 0.0
+
+    def at_solution(self):
+        self.has_solution = True
+
+    def __call__(self):
+        now = time.monotonic()
+        if self.has_solution and not self.stopped and now >= self._next_poll:
+            self._next_poll = now + self.poll_seconds
+            self.stopped = self.stop_event.is_set()
+        return self.stopped
+
+def add_stop_limit(routing, stop_event):
+    """Make the search end soon after stop_event is set; returns the StopLimit."""
+    stop_limit = StopLimit(stop_event)
+    routing.AddAtSolutionCallback(stop_limit.at_solution)
+    routing.AddSearchMonitor(routing.solver().CustomLimit(stop_limit))
+    return stop_limit
+
+def add_progress_callback(routing, progress):
+    """Put {'objective', 'seconds'} on the progress queue for every improving solution.
+
+    seconds counts from now, so register the callback just before the search starts.
+    """
+    start = time.perf_counter()
+    best_objective = None
+
+    def publish_improvement():
+        nonlocal best_objective
+        objective = routing.CostVar().Value()
+        if best_objective is None or objective < best_objective:
+            best_objective = objective
+            progress.put({'objective': objective, 'seconds': time.perf_counter() - start})
+
+    routing.AddAtSolutionCallback(publish_improvement)
+
+def solve(data, max_distance, search_options=None, initial_routes=None):
+    """Builds the routing model for `data` and runs the search.
+
+    search_options holds keyword arguments for build_search_parameters.
+    initial_routes, as returned by initial_routes_from, warm-start the search.
+
+    Returns (manager, routing, solution); solution is None if none was found.
+    """
+    manager, routing = build_model(data, max_distance)
+
+    # Setting first solution heuristic, metaheuristic and limits.
+    search_parameters = build_search_parameters(**(search_options or {}))
 
     # Solve the problem.
-    solution = routing.SolveWithParameters(search_parameters)
+    solution, _ = search(routing, search_parameters, initial_routes)
+    return manager, routing, solution
 
-    # Print solution on console.
+def search_statistics(routing):
+    """OR-Tools search counters for a model that has been solved."""
+    solver = routing.solver()
+    return {
+        'search_status': routing_enums_pb2.RoutingSearchStatus.Value.Name(routing.status()),
+        'solutions': solver.Solutions(),
+        'branches': solver.Branches(),
+        'failures': solver.Failures(),
+        'accepted_neighbors': solver.AcceptedNeighbors(),
+        'wall_time_ms': solver.WallTime(),
+    }
+
+def reset_peak_rss():
+    """Restart this process's peak RSS measurement, so peak_rss_kb only covers what follows.
+
+    Solves run in long-lived pool workers, whose lifetime peak says nothing
+    about the current run. Only Linux can reset it (through /proc/self/clear_refs);
+    returns False where it can't, and peak_rss_kb stays the lifetime peak.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_kb():
+    """Peak resident set size of this process in kilobytes, since reset_peak_rss where supported."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def peak_rss_stats(reset):
+    """peak_rss_kb for stats, with its scope: 'run' after a successful reset_peak_rss, else 'process'."""
+    return {'peak_rss_kb': peak_rss_kb(), 'peak_rss_scope': 'run' if reset else 'process'}
+
+def rejected_stats():
+    """Stage times and search statistics of a run the precheck rejected: nothing was built or searched."""
+    return {
+        'model_seconds': 0.0, 'search_seconds': 0.0, 'extract_seconds': 0.0, 'warm_start': False,
+        'search_status': 'PRECHECK_INFEASIBLE', 'solutions': 0, 'branches': 0, 'failures': 0,
+        'accepted_neighbors': 0, 'wall_time_ms': 0,
+    }
+
+def run(input_file, num_vehicles, depot, max_distance, search_options=None, initial_routes=None, stop_event=None,
+        vehicle_capacity=None, vehicle_speed=None, progress=None, precheck=None):
+    """Reads the locations file and solves the problem.
+
+    initial_routes are the "Routes" of an earlier solution to warm-start from.
+    search_options may also hold candidate_neighbors: with k set, the model
+    is built on the sparse k-nearest-neighbour graph instead of the full
+    distance matrix (see candidate_graph), and random_seed to reseed the
+    solver. When stop_event (a multiprocessing Event) is set, the search ends
+    as soon as it has a solution and keeps the best one found so far.
+    progress, a queue, gets the objective and search time of every improving
+    solution while the search runs (see add_progress_callback). vehicle_capacity
+    limits the summed demand of each route; vehicle_speed (km/h) converts
+    distances to travel times when the dataset has time windows.
+    A precheck (see precheck) runs before the model is built, and a problem
+    it proves infeasible returns straight away without searching. Callers
+    that already ran it pass its diagnosis as precheck, and it isn't repeated.
+    Returns (result, stats). result is the solution dict from extract_solution,
+    or None if no solution was found. stats holds the duration of each stage in
+    seconds, the peak RSS of this run (see reset_peak_rss) and the OR-Tools
+    search statistics.
+    """
+    stats = {}
+    peak_rss_reset = reset_peak_rss()
+    stage_start = time.perf_counter()
+    search_options = dict(search_options or {})
+    candidate_neighbors = search_options.pop('candidate_neighbors', None)
+    random_seed = search_options.pop('random_seed', None)
+
+    def end_stage(name):
+        nonlocal stage_start
+        now = time.perf_counter()
+        stats[f'{name}_seconds'] = now - stage_start
+        stage_start = now
+
+    # Read the locations straight into coordinate arrays (JSON file or stored .npy dataset)
+    locations = load_coordinates(input_file)
+    end_stage('load')
+
+    if initial_routes:
+        initial_routes = initial_routes_from(initial_routes, num_vehicles, depot, len(locations))
+    warm_start = bool(initial_routes)
+
+    if candidate_neighbors:
+        # Imported here: candidate_graph builds on this module
+        from candidate_graph import CandidateGraph, build_sparse_model, construct_routes
+        graph = CandidateGraph(locations.latitudes, locations.longitudes, candidate_neighbors)
+        data = {"num_vehicles": num_vehicles, "depot": depot}
+        data.update(constraint_data(locations, vehicle_capacity, vehicle_speed))
+        end_stage('matrix')
+    else:
+        # Instantiate the data problem.
+        data = create_data_model(locations, num_vehicles, depot,
+                                 vehicle_capacity=vehicle_capacity, vehicle_speed=vehicle_speed)
+        end_stage('matrix')
+
+    if precheck is None:
+        # Imported here: precheck builds on this module
+        from precheck import feasibility_precheck
+        precheck = feasibility_precheck(locations, num_vehicles, depot, max_distance, vehicle_capacity,
+                                        vehicle_speed, data.get("distance_matrix"),
+                                        use_cache=not candidate_neighbors)
+    stats['precheck'] = precheck
+    end_stage('precheck')
+    if not precheck['feasible']:
+        # Provably no solution: skip the model and the search altogether
+        stats.update(rejected_stats(), **peak_rss_stats(peak_rss_reset))
+        return None, stats
+
+    if candidate_neighbors:
+        # The sparse model starts from constructed routes unless there are earlier ones
+        if not initial_routes:
+            initial_routes = construct_routes(graph, num_vehicles, depot, data.get("time_windows"), data.get("demands"))
+        manager, routing = build_sparse_model(graph, data, max_distance, initial_routes)
+        stats['candidate_neighbors'] = candidate_neighbors
+    else:
+        manager, routing = build_model(data, max_distance)
+    search_parameters = build_search_parameters(**search_options)
+    if random_seed is not None:
+        routing.solver().ReSeed(random_seed)
+    stop_limit = add_stop_limit(routing, stop_event) if stop_event is not None else None
+    end_stage('model')
+
+    if progress is not None:
+        add_progress_callback(routing, progress)
+    solution, started_from_routes = search(routing, search_parameters, initial_routes)
+    stats['warm_start'] = warm_start and started_from_routes
+    if stop_limit is not None:
+        stats['stopped_early'] = stop_limit.stopped
+    end_stage('search')
+    stats.update(search_statistics(routing))
+
+    result = None
     if solution:
-        print_solution(data, manager, routing, solution)
+        result = extract_solution(data, manager, routing, solution)
+    end_stage('extract')
+    stats.update(peak_rss_stats(peak_rss_reset))
+    return result, stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a vehicle routing problem.")
+    parser.add_argument('input_file', help="JSON file with a Locations array, or a stored .npy dataset")
+    parser.add_argument('num_vehicles', type=int)
+    parser.add_argument('depot', type=int)
+    parser.add_argument('max_distance', type=int)
+    parser.add_argument('--first-solution-strategy', choices=FIRST_SOLUTION_STRATEGIES)
+    parser.add_argument('--local-search-metaheuristic', choices=LOCAL_SEARCH_METAHEURISTICS)
+    parser.add_argument('--time-limit', type=float, help="Search time limit in seconds")
+    parser.add_argument('--solution-limit', type=int, help="Stop after this many solutions")
+    parser.add_argument('--json', action='store_true', help="Print the solution as JSON")
+    parser.add_argument('--vehicle-capacity', type=int,
+                        help="Maximum summed demand per vehicle (locations without a Demand count as 0)")
+    parser.add_argument('--vehicle-speed', type=float,
+                        help=f"Average speed in km/h for time windows (default {DEFAULT_VEHICLE_SPEED_KMH})")
+    parser.add_argument('--candidate-neighbors', type=int, metavar='K',
+                        help="Sparse mode: only allow arcs to each stop's K nearest neighbours")
+    parser.add_argument('--portfolio', type=int, metavar='N',
+                        help="Run N differently configured searches in parallel and keep the best")
+    parser.add_argument('--decompose', action='store_true',
+                        help="Split the stops into clusters around the depot and solve them in parallel")
+    parser.add_argument('--workers', type=int,
+                        help="Worker processes for --decompose and --portfolio (default: one per CPU)")
+    return parser.parse_args(argv)
+
+def main():
+    """Entry point of the program."""
+    args = parse_args()
+    input_file = os.path.abspath(args.input_file)  # Get absolute path
+    search_options = {
+        'first_solution_strategy': args.first_solution_strategy,
+        'local_search_metaheuristic': args.local_search_metaheuristic,
+        'time_limit': args.time_limit,
+        'solution_limit': args.solution_limit,
+        'candidate_neighbors': args.candidate_neighbors,
+    }
+    if args.decompose:
+        # Imported here: decomposition builds on this module
+        from concurrent.futures import ProcessPoolExecutor
+        from decomposition import run_decomposed
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            result, stats = run_decomposed(input_file, args.num_vehicles, args.depot, args.max_distance,
+                                           search_options, executor.submit,
+                                           args.vehicle_capacity, args.vehicle_speed)
+    elif args.portfolio and args.portfolio > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from portfolio import run_portfolio
+        workers = args.workers or os.cpu_count() or 1
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=workers) as executor:
+            result, stats = run_portfolio(input_file, args.num_vehicles, args.depot, args.max_distance,
+                                          search_options, args.portfolio, executor.submit, manager.Event(),
+                                          workers, None, args.vehicle_capacity, args.vehicle_speed)
+    else:
+        result, stats = run(input_file, args.num_vehicles, args.depot, args.max_distance, search_options,
+                            vehicle_capacity=args.vehicle_capacity, vehicle_speed=args.vehicle_speed)
+    print(f"Solver statistics: {stats}", file=sys.stderr)
+
+    # Print solution on console.
+    if args.json:
+        print(json.dumps(result, separators=(',', ':')))
+    elif result:
+        print(format_solution(result))
     else:
         print("No solution found !")
 
@@ -1,20 +1,56 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, current_app, send_file, make_response
+from flask import Flask, render_template, request, redirect, url_for, flash, session, current_app, send_file, make_response, jsonify, Response, stream_with_context
 from flask_wtf import FlaskForm  # Add this import
 from wtforms import StringField, PasswordField, SubmitField  # Add this import
 from wtforms.validators import DataRequired, Length  # Add this import
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from database import *
+from solver_pool import solver_pool
+from progress import progress_board
+from locations_cache import locations_cache
+from datasets import dataset_store, parse_upload, DatasetError, MAX_DATASET_LOCATIONS
+from job_queue import JobQueue
+from decomposition import run_decomposed, DECOMPOSE_MIN_LOCATIONS
+from portfolio import run_portfolio, MAX_PORTFOLIO_SIZE
+from precheck import feasibility_precheck
+from concurrent.futures.process import BrokenProcessPool
+from vrpSolver import (FIRST_SOLUTION_STRATEGIES, LOCAL_SEARCH_METAHEURISTICS, DEFAULT_METAHEURISTIC_TIME_LIMIT,
+                       DEFAULT_VEHICLE_SPEED_KMH, cached_distance_matrix, rejected_stats)
+import hashlib
 import json
+import math
 import os
 import tempfile
-import subprocess
+import threading
+import csv
 import io
-import pandas as pd
 import time
 import xlsxwriter
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'
+# Upper bound for dataset uploads; 50k locations as JSON is well under this
+app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024
+
+# Location datasets bundled with the app, keyed by the vrp_problems.locations value
+LOCATIONS_FILES = {
+    1: 'locations_20.json',
+    2: 'locations_200.json',
+    3: 'locations_1000.json'
+}
+
+def locations_file_for(locations_choice):
+    """Path of the bundled JSON file for a locations choice, or None if it is invalid."""
+    if locations_choice not in LOCATIONS_FILES:
+        return None
+    return os.path.join(app.root_path, 'jsons', LOCATIONS_FILES[locations_choice])
+
+def locations_path_for(submission):
+    """Path of the locations a submission is solved on: its uploaded dataset's .npy
+    file if it has one, otherwise the bundled JSON file. None if neither is selected."""
+    if submission['dataset_id']:
+        dataset = fetch_dataset_by_id(submission['dataset_id'])
+        return dataset_store.path(dataset['content_hash']) if dataset else None
+    return locations_file_for(submission['locations'])
 
 # Flask-Login setup
 login_manager = LoginManager()
@@ -71,16 +107,67 @@ def index():
         return redirect(url_for('dashboard'))
     return render_template('index.html')
 
+# Fewer candidate arcs than this leave the sparse model too little room to move stops around
+MIN_CANDIDATE_NEIGHBORS = 5
+# Most variants a single batch request may create
+MAX_BATCH_VARIANTS = 500
+BATCH_INTEGER_COLUMNS = ('num_vehicles', 'depot', 'max_distance', 'time_limit', 'solution_limit',
+                         'candidate_neighbors', 'portfolio_size', 'vehicle_capacity')
+# Progress streams send a comment this often while the search is quiet, so proxies keep them open
+PROGRESS_KEEPALIVE_SECONDS = 15
+# How often a progress stream checks the database while its submission is queued or finishing
+PROGRESS_POLL_SECONDS = 1
+
+SUBMISSIONS_PAGE_SIZE = 50
+
+def encode_cursor(cursor):
+    return f'{cursor[0]}|{cursor[1]}' if cursor else None
+
+def decode_cursor(value):
+    if not value:
+        return None
+    created_at, submission_id = value.rsplit('|', 1)
+    return created_at, int(submission_id)
+
+def fetch_dashboard_page(status=None, cursor=None):
+    """One page of the current user's dashboard rows (all users' rows for admins)."""
+    if current_user.is_admin:
+        return fetch_submission_page(admin=True, status=status, before=cursor, limit=SUBMISSIONS_PAGE_SIZE)
+    return fetch_submission_page(user_id=current_user.id, status=status, before=cursor, limit=SUBMISSIONS_PAGE_SIZE)
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    if current_user.is_admin:
-        submissions = fetch_submissions(admin=True)  # Fetch all submissions for admin
-        template = 'admin_dashboard.html'
-    else:
-        submissions = fetch_submissions(user_id=current_user.id)  # Fetch user-specific submissions
-        template = 'dashboard.html'
-    return render_template(template, username=current_user.username, credits=current_user.credits, submissions=submissions)
+    status_filter = request.args.get('status') or None
+    submissions, next_cursor = fetch_dashboard_page(status=status_filter)
+    template = 'admin_dashboard.html' if current_user.is_admin else 'dashboard.html'
+    return render_template(
+        template,
+        username=current_user.username,
+        credits=current_user.credits,
+        submissions=submissions,
+        next_cursor=encode_cursor(next_cursor),
+        status_filter=status_filter
+    )
+
+@app.route('/dashboard/page')
+@login_required
+def dashboard_page():
+    """Next page of dashboard rows as an HTML fragment, loaded as the list is scrolled."""
+    status_filter = request.args.get('status') or None
+    try:
+        cursor = decode_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor.'}), 400
+    submissions, next_cursor = fetch_dashboard_page(status=status_filter, cursor=cursor)
+    partial = '_admin_submission_rows.html' if current_user.is_admin else '_submission_rows.html'
+    next_url = None
+    if next_cursor:
+        next_url = url_for('dashboard_page', cursor=encode_cursor(next_cursor), status=status_filter)
+    return jsonify({
+        'html': render_template(partial, submissions=submissions),
+        'next_url': next_url
+    })
 
 @app.route('/view_account')
 @login_required
@@ -161,26 +248,56 @@ def view_submission(submission_id):
     username = fetch_username_by_id(submission['user_id'])
 
     if request.method == 'POST':
+        # Parameters can't change under a job that is waiting for or using them
+        if submission['status'] in ('Queued', 'Running'):
+            flash("Submission is queued or running and can't be edited.")
+            return redirect(url_for('view_submission', submission_id=submission_id))
+
         try:
             # Retrieve and convert form data
             num_vehicles = request.form.get('num_vehicles') or submission['num_vehicles']
             depot = request.form.get('depot') or submission['depot']
             max_distance = request.form.get('max_distance') or submission['max_distance']
             locations = request.form.get('locations') or submission['locations']
+            dataset_id = submission['dataset_id']
             name = request.form.get('name') or submission['name']
 
             # Convert to appropriate types if not None
             num_vehicles = int(num_vehicles) if num_vehicles else None
             depot = int(depot) if depot else None
             max_distance = int(max_distance) if max_distance else None
-            locations = int(locations) if locations else 0  # Default to 0 if not provided
+            if isinstance(locations, str) and locations.startswith('dataset:'):
+                dataset_id = dataset_choice(locations, submission['user_id'])
+                locations = 0
+            else:
+                locations = int(locations) if locations else 0  # Default to 0 if not provided
+                if request.form.get('locations'):
+                    dataset_id = None
 
             # Validate 'locations' selection
             if locations not in [1, 2, 3]:
                 locations = 0
 
+            # Search options: empty means the solver default
+            first_solution_strategy = request.form.get('first_solution_strategy') or None
+            local_search_metaheuristic = request.form.get('local_search_metaheuristic') or None
+            time_limit = request.form.get('time_limit')
+            solution_limit = request.form.get('solution_limit')
+            candidate_neighbors = request.form.get('candidate_neighbors')
+            time_limit = int(time_limit) if time_limit else None
+            solution_limit = int(solution_limit) if solution_limit else None
+            candidate_neighbors = int(candidate_neighbors) if candidate_neighbors else None
+            portfolio_size = request.form.get('portfolio_size')
+            portfolio_size = int(portfolio_size) if portfolio_size else None
+            vehicle_capacity = request.form.get('vehicle_capacity')
+            vehicle_speed = request.form.get('vehicle_speed')
+            vehicle_capacity = int(vehicle_capacity) if vehicle_capacity else None
+            vehicle_speed = float(vehicle_speed) if vehicle_speed else None
+            validate_options(first_solution_strategy, local_search_metaheuristic, time_limit, solution_limit,
+                             candidate_neighbors, portfolio_size, vehicle_capacity, vehicle_speed)
+
             # Determine the status based on parameters
-            if num_vehicles and depot is not None and max_distance and locations != 0:
+            if num_vehicles and depot is not None and max_distance and (locations != 0 or dataset_id):
                 status = 'Ready'
             else:
                 status = 'Not Ready'
@@ -193,8 +310,20 @@ def view_submission(submission_id):
                 max_distance=max_distance,
                 locations=locations,
                 status=status,
-                name=name
+                name=name,
+                dataset_id=dataset_id
             )
+            update_search_options(
+                submission_id=submission_id,
+                first_solution_strategy=first_solution_strategy,
+                local_search_metaheuristic=local_search_metaheuristic,
+                time_limit=time_limit,
+                solution_limit=solution_limit,
+                warm_start='warm_start' in request.form,
+                candidate_neighbors=candidate_neighbors,
+                portfolio_size=portfolio_size
+            )
+            update_vehicle_constraints(submission_id, vehicle_capacity, vehicle_speed)
 
             flash("Problem updated successfully.")
             return redirect(url_for('view_submission', submission_id=submission_id))
@@ -206,7 +335,26 @@ def view_submission(submission_id):
             flash(f"An error occurred: {str(e)}")
             return redirect(url_for('view_submission', submission_id=submission_id))
 
-    return render_template('view_submission.html', submission=submission, username=username)
+    # Diagnose the saved parameters before the user runs them
+    precheck = None
+    locations_file = locations_path_for(submission)
+    if (None not in (submission['num_vehicles'], submission['depot'], submission['max_distance'])
+            and locations_file and os.path.isfile(locations_file)):
+        precheck = submission_precheck(submission, locations_cache.get(locations_file))
+
+    return render_template(
+        'view_submission.html',
+        submission=submission,
+        username=username,
+        first_solution_strategies=FIRST_SOLUTION_STRATEGIES,
+        local_search_metaheuristics=LOCAL_SEARCH_METAHEURISTICS,
+        default_metaheuristic_time_limit=DEFAULT_METAHEURISTIC_TIME_LIMIT,
+        max_portfolio_size=MAX_PORTFOLIO_SIZE,
+        solver_workers=solver_pool.max_workers,
+        default_vehicle_speed=DEFAULT_VEHICLE_SPEED_KMH,
+        datasets=fetch_datasets_by_user(submission['user_id']),
+        precheck=precheck
+    )
 
 
 @app.route('/update_submission/<int:submission_id>', methods=['POST'])
@@ -245,7 +393,9 @@ def update_submission(submission_id):
             depot=depot,
             max_distance=max_distance,
             locations=json.dumps(locations) if locations else None,  # Store locations as JSON
-            status=status  # Update status to 'Ready' or retain existing status
+            status=status,  # Update status to 'Ready' or retain existing status
+            name=current_submission['name'],
+            dataset_id=current_submission['dataset_id']
         )
 
         print('Submission updated successfully.')
@@ -280,159 +430,501 @@ def run_submission(submission_id):
         num_vehicles = submission['num_vehicles']
         depot = submission['depot']
         max_distance = submission['max_distance']
-        locations_choice = submission['locations']  # This is now an integer between 1 and 3
+        locations_choice = submission['locations']  # 1-3 for a bundled file, 0 with an uploaded dataset
 
         # Validate parameters
         if None in (num_vehicles, depot, max_distance, locations_choice):
             flash("Submission parameters are incomplete.")
             return redirect(url_for('dashboard'))
 
-        # Map the locations_choice to the corresponding JSON file
-        locations_files = {
-            1: 'locations_20.json',
-            2: 'locations_200.json',
-            3: 'locations_1000.json'
-        }
-
-        if locations_choice in locations_files:
-            # Build the path to the JSON file
-            locations_file = os.path.join(app.root_path, 'jsons', locations_files[locations_choice])
-        else:
+        # Ensure the locations file exists
+        locations_file = locations_path_for(submission)
+        if locations_file is None:
             flash("Invalid locations selection.")
             return redirect(url_for('dashboard'))
-
-        # Ensure the JSON file exists
         if not os.path.isfile(locations_file):
-            flash(f"Locations file not found: {locations_files[locations_choice]}")
+            flash(f"Locations file not found: {os.path.basename(locations_file)}")
             return redirect(url_for('dashboard'))
 
-        # Prepare the command to run vrpSolver.py
-        vrp_solver_script = os.path.join(app.root_path, 'vrpSolver.py')
-        cmd = [
-            'python', vrp_solver_script,
-            locations_file,
-            str(num_vehicles),
-            str(depot),
-            str(max_distance)
-        ]
+        # Hand the submission to the background workers and return straight away.
+        # force_resolve=1 runs the search even if an identical problem was solved before
+        enqueue_job(submission_id, force_resolve=request.args.get('force_resolve') == '1')
+        start_job_queue()
+        job_queue.notify()
+        flash("Submission queued.")
 
-        # Record the start time
-        start_time = time.time()
+        # Redirect back to the dashboard
+        return redirect(url_for('dashboard'))
 
-        # Run vrpSolver.py as a subprocess
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except Exception as e:
+        flash(f"An error occurred while running the submission: {str(e)}")
+        return redirect(url_for('dashboard'))
 
-        # Record the end time
-        end_time = time.time()
+def dataset_choice(value, user_id):
+    """Dataset id of a "dataset:<id>" locations value, which must be one of the user's uploads."""
+    dataset_id = int(value.split(':', 1)[1])
+    dataset = fetch_dataset_by_id(dataset_id)
+    if not dataset or dataset['user_id'] != user_id:
+        raise ValueError("unknown dataset")
+    return dataset_id
+
+def validate_options(first_solution_strategy=None, local_search_metaheuristic=None, time_limit=None,
+                     solution_limit=None, candidate_neighbors=None, portfolio_size=None,
+                     vehicle_capacity=None, vehicle_speed=None):
+    """Raise ValueError for search options or vehicle constraints the solver can't take; None means unset."""
+    if first_solution_strategy is not None and first_solution_strategy not in FIRST_SOLUTION_STRATEGIES:
+        raise ValueError(f"unknown first solution strategy {first_solution_strategy}")
+    if local_search_metaheuristic is not None and local_search_metaheuristic not in LOCAL_SEARCH_METAHEURISTICS:
+        raise ValueError(f"unknown local search metaheuristic {local_search_metaheuristic}")
+    if (time_limit is not None and time_limit <= 0) or (solution_limit is not None and solution_limit <= 0):
+        raise ValueError("limits must be positive")
+    if candidate_neighbors is not None and candidate_neighbors < MIN_CANDIDATE_NEIGHBORS:
+        raise ValueError(f"candidate neighbours must be at least {MIN_CANDIDATE_NEIGHBORS}")
+    if portfolio_size is not None and not 1 <= portfolio_size <= MAX_PORTFOLIO_SIZE:
+        raise ValueError(f"parallel searches must be between 1 and {MAX_PORTFOLIO_SIZE}")
+    if vehicle_capacity is not None and vehicle_capacity <= 0:
+        raise ValueError("vehicle capacity must be positive")
+    if vehicle_speed is not None and not (math.isfinite(vehicle_speed) and vehicle_speed > 0):
+        raise ValueError("vehicle speed must be positive")
+
+def search_options_for(submission):
+    """Solver search options stored on a submission row."""
+    return {
+        'first_solution_strategy': submission['first_solution_strategy'],
+        'local_search_metaheuristic': submission['local_search_metaheuristic'],
+        'time_limit': submission['time_limit'],
+        'solution_limit': submission['solution_limit'],
+        'candidate_neighbors': submission['candidate_neighbors'],
+    }
 
-        # Calculate execution time
-        execution_time = end_time - start_time  # In seconds
+def solution_cache_key(submission, locations_file):
+    """Canonical hash of everything that decides a solve's result: the coordinates
+    (not the file they came from), the problem parameters and the search options."""
+    coordinates = locations_cache.get(locations_file)
+    problem = {
+        'locations': coordinates.content_hash(),
+        'num_vehicles': submission['num_vehicles'],
+        'depot': submission['depot'],
+        'max_distance': submission['max_distance'],
+        'search_options': search_options_for(submission),
+        'portfolio_size': submission['portfolio_size'] or 1,
+        'vehicle_capacity': submission['vehicle_capacity'],
+        'vehicle_speed': submission['vehicle_speed'],
+    }
+    return hashlib.sha256(json.dumps(problem, sort_keys=True).encode('utf-8')).hexdigest()
+
+def submission_precheck(submission, coordinates):
+    """Feasibility diagnosis of a submission's parameters (see precheck.feasibility_precheck)."""
+    return feasibility_precheck(
+        coordinates, submission['num_vehicles'], submission['depot'], submission['max_distance'],
+        submission['vehicle_capacity'], submission['vehicle_speed'],
+        use_cache=not submission['candidate_neighbors']
+    )
 
-        # Calculate credits as integer part of execution time
-        credits = int(execution_time)
+def execute_submission(submission_id, force_resolve=False):
+    """Solves a queued submission and stores the results. Runs on a job queue thread."""
+    submission = fetch_submission_by_id(submission_id)
+    if not submission:
+        return
 
-        # Check for errors
-        if result.returncode != 0:
-            # vrpSolver.py returned an error
-            error_message = result.stderr or result.stdout
-            update_submission_results(
-                submission_id=submission_id,
-                success=0,
-                result=error_message,
-                status='Executed',  # Update status even if failed
-                execution_time=execution_time,
-                credits=credits
-            )
-            flash(f"Solver failed: {error_message}")
-        else:
-            # Get the output from vrpSolver.py
-            solver_output = result.stdout
+    locations_file = locations_path_for(submission)
+    if locations_file is None:
+        raise ValueError("Invalid locations selection.")
 
-            # Parse the output to extract the results
-            objective_value, routes = parse_solver_output(solver_output)
+    # Record the start time
+    start_time = time.time()
 
-            # Update the submission in the database
-            update_submission_results(
-                submission_id=submission_id,
-                objective_value=objective_value,
-                routes=json.dumps(routes) if routes else None,
-                result=solver_output,
-                success=1,
-                status='Executed',  # Update the status to 'Executed'
-                execution_time=execution_time,
-                credits=credits
-            )
-            flash("Submission executed successfully.")
+    # An identical problem solved before is served from the cache, free of charge
+    problem_key = solution_cache_key(submission, locations_file)
+    cached = None if force_resolve else fetch_cached_solution(problem_key)
+    if cached is not None:
+        update_submission_results(
+            submission_id=submission_id,
+            objective_value=cached['objective_value'],
+            routes=cached['routes'],
+            result=cached['result'],
+            success=1,
+            status='Executed',
+            execution_time=time.time() - start_time,
+            credits=0,
+            max_route_distance=cached['max_route_distance'],
+            solver_time=0.0,
+            stats=cached['stats'],
+            cache_hit=1,
+            cache_source_id=cached['submission_id']
+        )
+        return
+
+    # A provably infeasible problem never reaches the solver and costs nothing.
+    # The solve paths get this diagnosis rather than running the precheck again
+    diagnosis = submission_precheck(submission, locations_cache.get(locations_file))
+    if not diagnosis['feasible']:
+        stats = rejected_stats()
+        stats.update(load_seconds=0.0, matrix_seconds=0.0, precheck=diagnosis)
+        update_submission_results(
+            submission_id=submission_id,
+            result='No solution found !',
+            success=1,
+            status='Executed',
+            execution_time=time.time() - start_time,
+            credits=0,
+            solver_time=0.0,
+            stats=json.dumps(stats),
+            cache_hit=0,
+            clear_solution=True
+        )
+        return
 
-        # Redirect back to the dashboard
-        return redirect(url_for('dashboard'))
+    # A re-run starts from the routes of the submission's previous run, if it had a solution
+    initial_routes = None
+    if submission['warm_start']:
+        previous_routes = fetch_submission_output(submission_id, 'routes')
+        initial_routes = json.loads(previous_routes) if previous_routes else None
 
+    # Run the solver on the persistent worker pool
+    error_message = None
+    stats = None
+    try:
+        # Improving solutions go to the live progress page, which can also stop the search early
+        progress, stop_event = solver_pool.progress_channel()
+        progress_board.open(submission_id, stop_event)
+        publish = lambda event: progress_board.publish(submission_id, event)
+        try:
+            decompose = len(locations_cache.get(locations_file)) >= DECOMPOSE_MIN_LOCATIONS
+            if decompose and not submission['candidate_neighbors']:
+                # Large instances are split into clusters that are solved side by side on the pool,
+                # unless the user picked the sparse single-model mode
+                solver_result, stats = run_decomposed(
+                    locations_file, submission['num_vehicles'], submission['depot'], submission['max_distance'],
+                    search_options_for(submission), solver_pool.submit_task,
+                    submission['vehicle_capacity'], submission['vehicle_speed'], diagnosis,
+                    stop_event=stop_event, on_progress=publish
+                )
+                # Each cluster gets one cold search; record the options that did not apply
+                if submission['portfolio_size'] and submission['portfolio_size'] > 1:
+                    stats['portfolio_requested'] = submission['portfolio_size']
+                if initial_routes:
+                    stats['warm_start_requested'] = True
+            elif submission['portfolio_size'] and submission['portfolio_size'] > 1:
+                # Several differently configured searches on the pool; the best solution wins
+                solver_result, stats = run_portfolio(
+                    locations_file, submission['num_vehicles'], submission['depot'], submission['max_distance'],
+                    search_options_for(submission), submission['portfolio_size'], solver_pool.submit_task,
+                    stop_event, solver_pool.max_workers, initial_routes,
+                    submission['vehicle_capacity'], submission['vehicle_speed'], diagnosis,
+                    progress=progress, on_progress=publish
+                )
+            else:
+                solver_result, stats = solver_pool.solve(
+                    locations_file, submission['num_vehicles'], submission['depot'], submission['max_distance'],
+                    search_options_for(submission), initial_routes,
+                    vehicle_capacity=submission['vehicle_capacity'], vehicle_speed=submission['vehicle_speed'],
+                    progress=progress, stop_event=stop_event, on_progress=publish, precheck=diagnosis
+                )
+        finally:
+            progress_board.close(submission_id)
+    except BrokenProcessPool as e:
+        solver_pool.shutdown(wait=False)
+        error_message = str(e) or type(e).__name__
     except Exception as e:
-        flash(f"An error occurred while running the submission: {str(e)}")
-        return redirect(url_for('dashboard'))
+        error_message = str(e) or type(e).__name__
+
+    # Record the end time
+    end_time = time.time()
+
+    # Calculate execution time
+    execution_time = end_time - start_time  # In seconds
+
+    # Bill the OR-Tools search time only; queueing, loading and the matrix build are free.
+    # If the solver failed there are no stage timings, so fall back to the wall time.
+    solver_time = stats['search_seconds'] if stats else execution_time
+
+    # Calculate credits as integer part of solver time
+    credits = int(solver_time)
+    stats_json = json.dumps(stats) if stats else None
+
+    # Check for errors
+    if error_message is not None:
+        # The solver raised an error
+        update_submission_results(
+            submission_id=submission_id,
+            success=0,
+            result=error_message,
+            status='Executed',  # Update status even if failed
+            execution_time=execution_time,
+            credits=credits,
+            solver_time=solver_time,
+            cache_hit=0,
+            clear_solution=True
+        )
+    elif solver_result is None:
+        # The solver ran but the problem is infeasible
+        update_submission_results(
+            submission_id=submission_id,
+            result='No solution found !',
+            success=1,
+            status='Executed',
+            execution_time=execution_time,
+            credits=credits,
+            solver_time=solver_time,
+            stats=stats_json,
+            cache_hit=0,
+            clear_solution=True
+        )
+    else:
+        # The solver hands back a structured result, no text parsing needed
+        routes = solver_result['Routes']
+
+        routes_json = json.dumps(routes) if routes else None
+        result_json = json.dumps(solver_result, separators=(',', ':'))
+
+        # Update the submission in the database
+        update_submission_results(
+            submission_id=submission_id,
+            objective_value=solver_result['Objective'],
+            routes=routes_json,
+            result=result_json,
+            success=1,
+            status='Executed',  # Update the status to 'Executed'
+            execution_time=execution_time,
+            credits=credits,
+            max_route_distance=solver_result['MaxRouteDistance'],
+            solver_time=solver_time,
+            stats=stats_json,
+            cache_hit=0
+        )
+        # Only complete searches are cached; an infeasible or failed run may just have hit a limit,
+        # and a stopped one is not the result these parameters would give
+        if not stats.get('stopped_early'):
+            save_cached_solution(
+                problem_key, submission_id, solver_result['Objective'], solver_result['MaxRouteDistance'],
+                solver_time, stats_json, routes_json, result_json
+            )
+
+job_queue = JobQueue(execute_submission, workers=solver_pool.max_workers)
+
+database_ready = False
+database_lock = threading.Lock()
+
+def start_job_queue():
+    # Started lazily so the Flask reloader's parent process never runs jobs, and merely
+    # importing this module (tooling, tests) never opens or migrates the database
+    global database_ready
+    with database_lock:
+        if not database_ready:
+            # Make sure the job queue tables exist
+            init_db()
+            database_ready = True
+    job_queue.start()
+
+@app.before_request
+def ensure_job_queue_started():
+    start_job_queue()
+
+@app.route('/submission_status/<int:submission_id>')
+@login_required
+def submission_status(submission_id):
+    submission = fetch_submission_by_id(submission_id)
+    if not submission or (submission['user_id'] != current_user.id and not current_user.is_admin):
+        return jsonify({'error': 'Submission not found.'}), 404
+
+    job = fetch_latest_job(submission_id)
+    return jsonify({
+        'id': submission['id'],
+        'status': submission['status'],
+        'success': submission['success'],
+        'execution_time': submission['execution_time'],
+        'credits': submission['credits'],
+        'cache_hit': submission['cache_hit'],
+        'job': {
+            'id': job['id'],
+            'status': job['status'],
+            'attempts': job['attempts'],
+            'created_at': job['created_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at'],
+            'error': job['error'],
+        } if job else None,
+    })
     
-def parse_solver_output(output):
-    """
-    Parses the output from vrpSolver.py and extracts the objective value and routes.
+def batch_variant(values, num_locations):
+    """Validated submission columns for one batch variant, keyed by BATCH_PROBLEM_COLUMNS."""
+    unknown = set(values) - set(BATCH_PROBLEM_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown parameters: {', '.join(sorted(unknown))}")
+    variant = {}
+    for column in BATCH_PROBLEM_COLUMNS:
+        value = values.get(column)
+        if value is not None:
+            if column in BATCH_INTEGER_COLUMNS:
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise ValueError(f"{column} must be an integer")
+            elif column == 'vehicle_speed':
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise ValueError(f"{column} must be a number")
+                value = float(value)
+            elif not isinstance(value, str):
+                raise ValueError(f"{column} must be a string")
+        variant[column] = value
+
+    if variant['num_vehicles'] is None or variant['num_vehicles'] <= 0:
+        raise ValueError("num_vehicles must be positive")
+    if variant['depot'] is None or not 0 <= variant['depot'] < num_locations:
+        raise ValueError(f"depot must be a location index below {num_locations}")
+    if variant['max_distance'] is None or variant['max_distance'] <= 0:
+        raise ValueError("max_distance must be positive")
+    validate_options(**{column: value for column, value in variant.items()
+                        if column not in ('num_vehicles', 'depot', 'max_distance')})
+    return variant
+
+@app.route('/api/batches', methods=['POST'])
+@login_required
+def create_batch():
+    """Create and enqueue many parameter variants of one dataset in a single request.
+
+    The JSON body names the locations (1-3 for a bundled file, or "dataset:<id>"),
+    "parameters" shared by every variant and a "variants" list whose entries
+    override them. All submissions and their jobs are inserted in one
+    transaction. The distance matrix is built once into the on-disk cache
+    before the jobs are queued, so every solve memory-maps the same file.
     """
-    objective_value = None
-    routes = []
-    max_route_distance = None
-
-    lines = output.strip().split('\n')
-    current_vehicle = None
-    route = []
-    route_distance = None
-
-    for line in lines:
-        line = line.strip()
-        if line.startswith('Objective:'):
-            # Extract objective value
-            try:
-                objective_value = int(line.split(':')[1].strip())
-            except ValueError:
-                objective_value = None
-        elif line.startswith('Route for vehicle'):
-            # Save previous vehicle's route if exists
-            if current_vehicle is not None:
-                routes.append({
-                    'Vehicle': current_vehicle,
-                    'Route': route,
-                    'Distance': route_distance
-                })
-            # Start new vehicle route
-            current_vehicle = int(line.split('vehicle')[1].split(':')[0].strip())
-            route = []
-            route_distance = None
-        elif '->' in line:
-            # Extract route nodes
-            nodes = line.strip().split('->')
-            for node in nodes:
-                node = node.strip()
-                if node.isdigit():
-                    route.append(int(node))
-        elif line.startswith('Distance of the route:'):
-            # Extract route distance
-            try:
-                route_distance = int(line.split(':')[1].strip().rstrip('m'))
-            except ValueError:
-                route_distance = None
-        elif line.startswith('Maximum of the route distances:'):
-            # Extract max route distance
-            try:
-                max_route_distance = int(line.split(':')[1].strip().rstrip('m'))
-            except ValueError:
-                max_route_distance = None
-
-    # Append the last vehicle's route
-    if current_vehicle is not None:
-        routes.append({
-            'Vehicle': current_vehicle,
-            'Route': route,
-            'Distance': route_distance
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({'error': 'Expected a JSON object.'}), 400
+
+    try:
+        locations = body.get('locations')
+        dataset_id = None
+        if isinstance(locations, str) and locations.startswith('dataset:'):
+            dataset_id = dataset_choice(locations, current_user.id)
+            locations = 0
+        elif locations not in (1, 2, 3):
+            raise ValueError('locations must be 1, 2, 3 or "dataset:<id>"')
+        shared = body.get('parameters') or {}
+        variants = body.get('variants')
+        if not isinstance(shared, dict) or not isinstance(variants, list) or not variants:
+            raise ValueError("expected a parameters object and a non-empty variants list")
+        if len(variants) > MAX_BATCH_VARIANTS:
+            raise ValueError(f"a batch can have at most {MAX_BATCH_VARIANTS} variants")
+        if not all(isinstance(variant, dict) for variant in variants):
+            raise ValueError("each variant must be an object")
+
+        locations_file = locations_path_for({'locations': locations, 'dataset_id': dataset_id})
+        coordinates = locations_cache.get(locations_file)
+        variants = [batch_variant(dict(shared, **variant), len(coordinates)) for variant in variants]
+        name = str(body.get('name') or 'Batch')[:255]
+    except (ValueError, OSError) as e:
+        return jsonify({'error': f'Invalid input: {str(e)}'}), 400
+
+    # One matrix build for the whole batch, unless no variant solves on the full matrix
+    start = time.perf_counter()
+    if len(coordinates) < DECOMPOSE_MIN_LOCATIONS and any(not variant['candidate_neighbors'] for variant in variants):
+        cached_distance_matrix(coordinates)
+    matrix_seconds = time.perf_counter() - start
+
+    batch_id, submission_ids = insert_batch(current_user.id, name, locations, dataset_id, variants)
+    start_job_queue()
+    job_queue.notify()
+    return jsonify({
+        'id': batch_id,
+        'submissions': submission_ids,
+        'matrix_seconds': matrix_seconds,
+        'status_url': url_for('batch_status', batch_id=batch_id),
+    }), 201
+
+@app.route('/api/batches/<int:batch_id>')
+@login_required
+def batch_status(batch_id):
+    """Progress of a batch, with aggregated results once every variant has been executed."""
+    batch = fetch_batch_by_id(batch_id)
+    if not batch or (batch['user_id'] != current_user.id and not current_user.is_admin):
+        return jsonify({'error': 'Batch not found.'}), 404
+
+    variants = []
+    counts = {}
+    for submission in fetch_batch_submissions(batch_id):
+        counts[submission['status']] = counts.get(submission['status'], 0) + 1
+        variant = {'id': submission['id']}
+        variant.update({column: submission[column] for column in BATCH_PROBLEM_COLUMNS})
+        variant.update({
+            'status': submission['status'],
+            'success': submission['success'],
+            'objective_value': submission['objective_value'],
+            'max_route_distance': submission['max_route_distance'],
+            'solver_time': submission['solver_time'],
+            'credits': submission['credits'],
+            'cache_hit': submission['cache_hit'],
         })
+        variants.append(variant)
+
+    complete = counts.get('Executed', 0) == len(variants)
+    response = {
+        'id': batch['id'],
+        'name': batch['name'],
+        'created_at': batch['created_at'],
+        'total': len(variants),
+        'counts': counts,
+        'complete': complete,
+        'variants': variants,
+    }
+    if complete:
+        solved = [variant for variant in variants if variant['objective_value'] is not None]
+        best = min(solved, key=lambda variant: variant['objective_value']) if solved else None
+        response['summary'] = {
+            'solved': len(solved),
+            'no_solution': sum(1 for variant in variants if variant['success'] == 1 and variant['objective_value'] is None),
+            'failed': sum(1 for variant in variants if variant['success'] == 0),
+            'credits': sum(variant['credits'] or 0 for variant in variants),
+            'solver_time': sum(variant['solver_time'] or 0 for variant in variants),
+            'best_submission_id': best['id'] if best else None,
+            'best_objective_value': best['objective_value'] if best else None,
+        }
+    return jsonify(response)
+
+@app.route('/submission_progress/<int:submission_id>')
+@login_required
+def submission_progress(submission_id):
+    """Server-sent events: one message per improving solution of the running search,
+    then a done event once the submission has been executed."""
+    submission = fetch_submission_by_id(submission_id)
+    if not submission or (submission['user_id'] != current_user.id and not current_user.is_admin):
+        return jsonify({'error': 'Submission not found.'}), 404
+
+    def generate():
+        seen = 0
+        while True:
+            events = progress_board.wait(submission_id, seen, PROGRESS_KEEPALIVE_SECONDS)
+            if events is None:
+                # Not searching in this process: still queued, finishing up, done, or deleted
+                current = fetch_submission_by_id(submission_id)
+                if current is None or current['status'] not in ('Queued', 'Running'):
+                    yield 'event: done\ndata: {}\n\n'
+                    return
+                time.sleep(PROGRESS_POLL_SECONDS)
+                yield ': waiting\n\n'
+            elif not events:
+                yield ': keep-alive\n\n'
+            for event in events or ():
+                seen += 1
+                yield f"data: {json.dumps(dict(event, solution=seen))}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-    return objective_value, routes
+@app.route('/stop_submission/<int:submission_id>', methods=['POST'])
+@login_required
+def stop_submission(submission_id):
+    submission = fetch_submission_by_id(submission_id)
+    if not submission or (submission['user_id'] != current_user.id and not current_user.is_admin):
+        flash("Submission not found.")
+        return redirect(url_for('dashboard'))
+
+    if progress_board.request_stop(submission_id):
+        flash("Stopping the search; the best solution so far will be kept.")
+    else:
+        flash("This submission has no running search that can be stopped.")
+    return redirect(url_for('view_results', submission_id=submission_id))
 
 @app.route('/delete_submission/<int:submission_id>', methods=['POST'])
 @login_required
@@ -469,6 +961,10 @@ def view_results(submission_id):
         flash("Access denied.")
         return redirect(url_for('dashboard'))
 
+    # A queued or running solve gets the live progress view, fed by submission_progress
+    if submission['status'] in ('Queued', 'Running'):
+        return render_template('view_results.html', submission=submission, live=True)
+
     # Check if the submission has been executed
     if submission['status'] != 'Executed':
         flash("Results are not available for this submission.")
@@ -476,8 +972,9 @@ def view_results(submission_id):
 
     # Retrieve the results from the submission
     objective_value = submission['objective_value']
-    routes_json = submission['routes']
-    result_text = submission['result']
+    # The large outputs live in submission_outputs and are only loaded here
+    routes_json = fetch_submission_output(submission_id, 'routes')
+    result_text = fetch_submission_output(submission_id, 'result')
     success = submission['success']
 
     # Parse the routes JSON
@@ -494,31 +991,28 @@ def view_results(submission_id):
     num_vehicles = submission['num_vehicles']
     depot = submission['depot']
     max_distance = submission['max_distance']
-    locations_choice = submission['locations']  # Now an integer between 1 and 3
-
-    # Map the locations_choice to the corresponding JSON file
-    locations_files = {
-        1: 'locations_20.json',
-        2: 'locations_200.json',
-        3: 'locations_1000.json'
-    }
-
-    if locations_choice in locations_files:
-        locations_file = os.path.join(app.root_path, 'jsons', locations_files[locations_choice])
-        # Read the locations data from the file
+    locations_file = locations_path_for(submission)
+    if locations_file is not None:
+        # Parsed coordinates come from the process-wide cache
         try:
-            with open(locations_file, 'r') as f:
-                locations_data = json.load(f)
-                locations = locations_data.get('Locations', [])
+            coordinates = locations_cache.get(locations_file)
         except Exception as e:
             flash(f"Error reading locations file: {str(e)}")
-            locations = None
+            coordinates = None
     else:
-        locations = None
+        coordinates = None
         flash("Invalid locations selection.")
 
-    # Parse the result_text to extract MaxRouteDistance
-    if result_text:
+    # Look up the [latitude, longitude] of every stop for the route tables
+    if routes and coordinates is not None:
+        for route_info in routes:
+            route_info['Coordinates'] = coordinates.take(route_info['Route'])
+
+    # Results stored by the structured solver carry MaxRouteDistance in its own column;
+    # older submissions only have it in the raw solver text
+    if submission['max_route_distance'] is not None:
+        max_route_distance = submission['max_route_distance']
+    elif result_text:
         try:
             lines = result_text.strip().split('\n')
             max_route_distance = None
@@ -533,6 +1027,9 @@ def view_results(submission_id):
     else:
         max_route_distance = 'N/A'
 
+    # Per-stage timings and search statistics, if the run recorded them
+    stats = json.loads(submission['stats']) if submission['stats'] else None
+
     # Compute the number of vehicles used
     vehicles_used = sum(1 for route in routes if route['Distance'] > 0) if routes else 0
 
@@ -550,85 +1047,134 @@ def view_results(submission_id):
         num_vehicles=num_vehicles,
         depot=depot,
         max_distance=max_distance,
-        locations=locations,
         max_route_distance=max_route_distance,
         vehicles_used=vehicles_used,
         total_distance=total_distance,
         execution_time=submission['execution_time'],  # Already added previously
-        credits=submission['credits']  # Add this line
+        credits=submission['credits'],  # Add this line
+        solver_time=submission['solver_time'],
+        stats=stats,
+        cache_hit=submission['cache_hit'],
+        cache_source_id=submission['cache_source_id']
     )
 
-@app.route('/download_excel/<int:submission_id>')
-@login_required
-def download_excel(submission_id):
+EXPORT_HEADER = ['Vehicle', 'Stop Number', 'Location Index', 'Latitude', 'Longitude']
+EXPORT_CHUNK_ROWS = 1000
+
+def load_export_data(submission_id):
+    """Routes and coordinates for a downloadable submission.
+
+    Returns (routes, coordinates, None) or (None, None, redirect_response) if the
+    submission can't be exported.
+    """
     # Fetch the submission
     submission = fetch_submission_by_id(submission_id)
 
     # Check permissions
     if not submission or (submission['user_id'] != current_user.id and not current_user.is_admin):
         flash("Access denied.")
-        return redirect(url_for('dashboard'))
+        return None, None, redirect(url_for('dashboard'))
 
     # Check if the submission was successful
     if submission['status'] != 'Executed' or submission['success'] != 1:
         flash("No data available for download.")
-        return redirect(url_for('dashboard'))
+        return None, None, redirect(url_for('dashboard'))
 
     # Retrieve routes and locations
-    routes_json = submission['routes']
-    routes = json.loads(routes_json) if routes_json else None
-
-    # Retrieve locations data based on `locations_choice`
-    locations_choice = submission['locations']
-    locations_files = {
-        1: 'locations_20.json',
-        2: 'locations_200.json',
-        3: 'locations_1000.json'
-    }
+    routes_json = fetch_submission_output(submission_id, 'routes')
+    routes = json.loads(routes_json) if routes_json else []
 
-    if locations_choice in locations_files:
-        locations_file = os.path.join(app.root_path, 'jsons', locations_files[locations_choice])
-        try:
-            with open(locations_file, 'r') as f:
-                locations_data = json.load(f)
-                locations = locations_data.get('Locations', [])
-        except Exception as e:
-            flash(f"Error reading locations file: {str(e)}")
-            return redirect(url_for('dashboard'))
-    else:
+    # Retrieve the locations the submission was solved on
+    locations_file = locations_path_for(submission)
+    if locations_file is None:
         flash("Invalid locations selection.")
-        return redirect(url_for('dashboard'))
+        return None, None, redirect(url_for('dashboard'))
+    try:
+        coordinates = locations_cache.get(locations_file)
+    except Exception as e:
+        flash(f"Error reading locations file: {str(e)}")
+        return None, None, redirect(url_for('dashboard'))
+    return routes, coordinates, None
 
-    # Generate Excel file
-    output = io.BytesIO()
-    writer = pd.ExcelWriter(output, engine='xlsxwriter')
-
-    for route_info in routes:
-        if route_info['Distance'] > 0:
-            data = []
-            for idx, location_index in enumerate(route_info['Route']):
-                loc = locations[location_index]
-                data.append({
-                    'Stop Number': idx + 1,
-                    'Location Index': location_index,
-                    'Latitude': loc['Latitude'],
-                    'Longitude': loc['Longitude']
-                })
-            df = pd.DataFrame(data)
-            sheet_name = f'Vehicle_{route_info["Vehicle"]}'
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-    writer.save()
-    output.seek(0)
+def iter_route_rows(route_info, coordinates):
+    """(stop number, location index, latitude, longitude) for each stop of a route."""
+    route_coordinates = coordinates.take(route_info['Route'])
+    for idx, (location_index, (latitude, longitude)) in enumerate(zip(route_info['Route'], route_coordinates)):
+        yield idx + 1, location_index, latitude, longitude
+
+@app.route('/download_excel/<int:submission_id>')
+@login_required
+def download_excel(submission_id):
+    routes, coordinates, error_response = load_export_data(submission_id)
+    if error_response:
+        return error_response
+
+    # Write the workbook to a temporary file in constant-memory mode: xlsxwriter
+    # flushes each row to disk as soon as the next one starts
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        for route_info in routes:
+            if route_info['Distance'] > 0:
+                worksheet = workbook.add_worksheet(f'Vehicle_{route_info["Vehicle"]}')
+                worksheet.write_row(0, 0, EXPORT_HEADER[1:])
+                for row, values in enumerate(iter_route_rows(route_info, coordinates), start=1):
+                    worksheet.write_row(row, 0, values)
+        workbook.close()
+        # Keep an open handle and unlink right away; the file is streamed from the
+        # handle and the disk space is freed as soon as the response closes it
+        output = open(path, 'rb')
+    finally:
+        os.remove(path)
 
     # Send the file
     return send_file(
         output,
-        attachment_filename=f'submission_{submission_id}_routes.xlsx',
+        download_name=f'submission_{submission_id}_routes.xlsx',
         as_attachment=True,
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
 
+@app.route('/download_routes/<int:submission_id>/<export_format>')
+@login_required
+def download_routes(submission_id, export_format):
+    """Stream the routes as CSV or NDJSON, EXPORT_CHUNK_ROWS rows at a time."""
+    if export_format not in ('csv', 'ndjson'):
+        flash("Unsupported export format.")
+        return redirect(url_for('dashboard'))
+
+    routes, coordinates, error_response = load_export_data(submission_id)
+    if error_response:
+        return error_response
+
+    def generate():
+        buffer = io.StringIO()
+        if export_format == 'csv':
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_HEADER)
+        rows = 0
+        for route_info in routes:
+            if route_info['Distance'] <= 0:
+                continue
+            for values in iter_route_rows(route_info, coordinates):
+                if export_format == 'csv':
+                    writer.writerow((route_info['Vehicle'],) + values)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_HEADER, (route_info['Vehicle'],) + values))))
+                    buffer.write('\n')
+                rows += 1
+                if rows % EXPORT_CHUNK_ROWS == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        yield buffer.getvalue()
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=submission_{submission_id}_routes.{export_format}'
+    return response
+
 @app.route('/download_raw/<int:submission_id>')
 @login_required
 def download_raw(submission_id):
@@ -646,17 +1192,56 @@ def download_raw(submission_id):
         return redirect(url_for('dashboard'))
 
     # Retrieve result text or routes
-    result_text = submission['result']
+    result_text = fetch_submission_output(submission_id, 'result')
     if not result_text:
         flash("No result data available.")
         return redirect(url_for('dashboard'))
 
+    # Structured results are JSON; older submissions hold the solver's text report
+    try:
+        json.loads(result_text)
+        extension, mimetype = 'json', 'application/json'
+    except ValueError:
+        extension, mimetype = 'txt', 'text/plain'
+
     # Send the raw data as a file
     response = make_response(result_text)
-    response.headers['Content-Disposition'] = f'attachment; filename=submission_{submission_id}_raw.txt'
-    response.mimetype = 'text/plain'
+    response.headers['Content-Disposition'] = f'attachment; filename=submission_{submission_id}_raw.{extension}'
+    response.mimetype = mimetype
     return response
 
+@app.route('/datasets', methods=['GET', 'POST'])
+@login_required
+def datasets_page():
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash("Please choose a file to upload.")
+            return redirect(url_for('datasets_page'))
+
+        try:
+            # Parsed and validated straight from the upload stream, then stored once per content
+            coordinates = parse_upload(upload.stream, upload.filename)
+            content_hash = dataset_store.save(coordinates)
+            insert_dataset(current_user.id, upload.filename[:255], content_hash, len(coordinates))
+            flash(f"Dataset uploaded: {len(coordinates)} locations.")
+        except DatasetError as e:
+            flash(f"Invalid dataset: {str(e)}")
+        except Exception as e:
+            flash(f"An error occurred: {str(e)}")
+        return redirect(url_for('datasets_page'))
+
+    return render_template(
+        'datasets.html',
+        datasets=fetch_datasets_by_user(current_user.id),
+        max_locations=MAX_DATASET_LOCATIONS
+    )
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    flash("The uploaded file is too large.")
+    return redirect(url_for('datasets_page'))
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404